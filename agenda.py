@@ -0,0 +1,176 @@
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from cache import TTLCache
+
+
+def _local_naive(iso_value) -> datetime:
+    """Timestamp ISO del backend (UTC o con offset) a hora local sin tzinfo."""
+    return datetime.fromisoformat(str(iso_value).replace("Z", "+00:00")).astimezone(None).replace(tzinfo=None)
+
+
+@dataclass(frozen=True)
+class Slot:
+    inicio: datetime  # hora local, sin tzinfo (como lo calcula el backend)
+    fin: datetime
+    tipo: str
+
+    @property
+    def disponible(self) -> bool:
+        return self.tipo in ("disponible", "libre")
+
+
+@dataclass(frozen=True)
+class Reserva:
+    id: int
+    inicio: datetime  # hora local, sin tzinfo
+    dia: date
+    usuario_id: str | None
+    usuario_nombre: str
+    puede_gestionar: bool  # dueño o admin (según el usuario de la sesión)
+    raw: dict = field(compare=False, repr=False)
+
+
+@dataclass
+class DiaAgenda:
+    slots: list[Slot]
+    reservas: list[Reserva]
+    por_inicio: dict[datetime, Reserva]
+
+
+def parse_slots(raw_slots: list[dict]) -> list[Slot]:
+    slots = []
+    for slot in raw_slots or []:
+        try:
+            slots.append(Slot(
+                inicio=datetime.fromisoformat(str(slot.get("inicio"))).replace(tzinfo=None),
+                fin=datetime.fromisoformat(str(slot.get("fin"))).replace(tzinfo=None),
+                tipo=slot.get("tipo", "no_habilitado"),
+            ))
+        except (ValueError, TypeError) as e:
+            print(f"WARN: Skipping slot due to invalid date: {slot} | Error: {e}")
+    return slots
+
+
+def parse_reservas(raw_reservas: list[dict], usuario: dict = None) -> list[Reserva]:
+    usuario = usuario or {}
+    me = str(usuario.get("id")) if usuario.get("id") is not None else None
+    is_admin = usuario.get("rol") == "admin"
+    reservas = []
+    for r in raw_reservas or []:
+        try:
+            inicio = _local_naive(r.get("inicio"))
+        except (ValueError, TypeError) as e:
+            print(f"Error parsing date for reservation {r.get('id')}: {e}")
+            continue
+        user_info = r.get("usuario") or {}
+        owner = user_info.get("id", r.get("usuario_id"))
+        owner = str(owner) if owner is not None else None
+        reservas.append(Reserva(
+            id=r.get("id"),
+            inicio=inicio,
+            dia=inicio.date(),
+            usuario_id=owner,
+            usuario_nombre=user_info.get("nombre", "N/A"),
+            puede_gestionar=is_admin or (me is not None and owner == me),
+            raw=r,
+        ))
+    return reservas
+
+
+class AgendaCache:
+    """
+    Horario y reservas de cada laboratorio por día: {(lab_id, date): DiaAgenda}.
+    Cada respuesta del backend se parsea una sola vez al guardarla.
+
+    Permite pedir al backend solo los días que faltan y precargar semanas
+    vecinas en segundo plano. Las descargas en curso se registran para que una
+    petición en primer plano espere a la precarga en vez de repetirla.
+    """
+
+    def __init__(self, ttl: float | None = None):
+        self._dias = TTLCache(ttl=ttl)
+        self._reserva_dia: dict = {}  # reserva_id -> (lab_id, date)
+        self._en_vuelo: dict = {}  # (lab_id, date) -> Future
+        self._version = 0  # sube con cada invalidación
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self, lab_id: int, d: date):
+        return self._dias.get((lab_id, d))
+
+    def guardar(self, lab_id: int, days: list[date], horario: dict, reservas: list[dict],
+                version: int = None, usuario: dict = None) -> dict:
+        """
+        Reparte una respuesta de rango por día y la guarda; devuelve {date: DiaAgenda}.
+        Si hubo una invalidación desde `version` (la descarga empezó antes de
+        una reserva/cancelación) el resultado se devuelve pero no se guarda.
+        """
+        por_dia = {d: [] for d in days}
+        for r in parse_reservas(reservas, usuario):
+            if r.dia in por_dia:
+                por_dia[r.dia].append(r)
+        dias = {
+            d: DiaAgenda(
+                slots=parse_slots(horario.get(d.isoformat(), [])),
+                reservas=por_dia[d],
+                por_inicio={r.inicio: r for r in por_dia[d]},
+            )
+            for d in days
+        }
+        with self._lock:
+            if version is not None and version != self._version:
+                return dias
+            for d, dia in dias.items():
+                for r in dia.reservas:
+                    if r.id is not None:
+                        self._reserva_dia[r.id] = (lab_id, d)
+                self._dias.set((lab_id, d), dia)
+        return dias
+
+    def en_vuelo(self, lab_id: int, days: list[date]) -> dict:
+        with self._lock:
+            return {d: self._en_vuelo[(lab_id, d)] for d in days if (lab_id, d) in self._en_vuelo}
+
+    def reservar_vuelo(self, lab_id: int, days: list[date]):
+        """Marca como en curso los días que nadie está descargando; devuelve (future, días)."""
+        future = Future()
+        with self._lock:
+            libres = [d for d in days if (lab_id, d) not in self._en_vuelo]
+            for d in libres:
+                self._en_vuelo[(lab_id, d)] = future
+        return future, libres
+
+    def terminar_vuelo(self, lab_id: int, days: list[date], future: Future):
+        with self._lock:
+            for d in days:
+                if self._en_vuelo.get((lab_id, d)) is future:
+                    del self._en_vuelo[(lab_id, d)]
+        if not future.done():
+            future.set_result(None)
+
+    def invalidar_dia(self, lab_id: int, d: date):
+        with self._lock:
+            self._version += 1
+            self._dias.invalidate((lab_id, d))
+
+    def invalidar_reserva(self, reserva_id) -> bool:
+        """Descarta el día de la reserva; False si no se conoce (el llamador decide)."""
+        with self._lock:
+            ubicacion = self._reserva_dia.pop(reserva_id, None)
+            if ubicacion is None:
+                return False
+            self._version += 1
+            self._dias.invalidate(ubicacion)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._dias.clear()
+            self._reserva_dia.clear()
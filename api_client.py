@@ -1,94 +1,644 @@
+import functools
 import os
+import threading
+import time
 import requests
 import flet as ft
-from datetime import date
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from agenda import AgendaCache
+from cache import TTLCache
+from catalogo import Catalogo
+from inventario import Inventario
+from ocupacion import OcupacionRecursos
+from reglas_horario import ReglasIndex, diferencia_horario, materializar
+import transport
+from telemetry import logger, telemetry
+
+# Catálogos (planteles, laboratorios, tipos de recurso) cambian pocas veces por
+# semestre: se comparten entre todas las sesiones del proceso con expiración.
+CATALOG_TTL_SECONDS = float(os.environ.get("CATALOG_TTL_SECONDS", 300))
+_catalog_cache = TTLCache(ttl=CATALOG_TTL_SECONDS)
+
+# Ocupación de recursos (préstamos activos): por sesión, porque depende del
+# token; se descarta en cada mutación de préstamos o al expirar.
+OCUPACION_TTL_SECONDS = float(os.environ.get("OCUPACION_TTL_SECONDS", 60))
+
+# Agenda de laboratorios (horario + reservas por día): por sesión; se descarta
+# por día al crear/cancelar y expira pronto porque otros usuarios también reservan.
+AGENDA_TTL_SECONDS = float(os.environ.get("AGENDA_TTL_SECONDS", 60))
+
+# Reglas de horario: por sesión (el endpoint es de admin). Con ellas la agenda
+# se arma localmente y solo se piden las reservas; cada laboratorio se compara
+# una vez por índice descargado contra /laboratorios/{id}/horario antes de
+# confiar en el cálculo local. Sesiones sin rol admin no piden las reglas.
+REGLAS_TTL_SECONDS = float(os.environ.get("REGLAS_TTL_SECONDS", 120))
+HORARIO_LOCAL = os.environ.get("HORARIO_LOCAL", "1") == "1"
+
+# Búsquedas de usuarios (admin): por sesión, LRU de las últimas consultas; se
+# descartan completas al editar o borrar un usuario.
+USERS_QUERY_TTL_SECONDS = float(os.environ.get("USERS_QUERY_TTL_SECONDS", 30))
+USERS_QUERY_CACHE_SIZE = int(os.environ.get("USERS_QUERY_CACHE_SIZE", 32))
+# /usuarios aún no pagina: con esto apagado se pide la lista filtrada una vez
+# (queda en la caché de arriba) y las páginas se recortan localmente.
+USERS_SERVER_PAGING = os.environ.get("USERS_SERVER_PAGING", "0") == "1"
+
+# Inventario (/recursos) por filtro, igual que los usuarios: se pagina en el
+# backend si lo soporta; si no, la lista filtrada se pide una vez y se recorta.
+# Se descarta al crear/editar/borrar recursos o cambiar el estado de un préstamo.
+# Sin paginado en el backend, el inventario completo se indexa (ver
+# get_inventario) y los filtros de PrestamosView se resuelven en memoria.
+RECURSOS_TTL_SECONDS = float(os.environ.get("RECURSOS_TTL_SECONDS", 30))
+RECURSOS_CACHE_SIZE = int(os.environ.get("RECURSOS_CACHE_SIZE", 16))
+RECURSOS_SERVER_PAGING = os.environ.get("RECURSOS_SERVER_PAGING", "0") == "1"
+
+# Pool acotado compartido para peticiones independientes (ver ApiClient.gather).
+API_MAX_WORKERS = int(os.environ.get("API_MAX_WORKERS", 8))
+_POOL_THREAD_PREFIX = "api-gather"
+_executor = ThreadPoolExecutor(max_workers=API_MAX_WORKERS, thread_name_prefix=_POOL_THREAD_PREFIX)
+# Precargas (semanas vecinas, matriz de todos los laboratorios) van a un pool
+# aparte y chico: nunca hacen cola delante de lo que otra sesión necesita para pintar.
+API_PREFETCH_WORKERS = int(os.environ.get("API_PREFETCH_WORKERS", 2))
+_PREFETCH_THREAD_PREFIX = "api-prefetch"
+_prefetch_executor = ThreadPoolExecutor(max_workers=API_PREFETCH_WORKERS, thread_name_prefix=_PREFETCH_THREAD_PREFIX)
+
+# Si el backend está caído, todas las sesiones deben fallar rápido a la vez.
+_breaker = transport.CircuitBreaker()
+
+# Endpoints opcionales del backend: se prueban una vez y se recuerda si existen.
+REGLAS_BATCH_ENDPOINT = "/admin/horarios/reglas/batch"
+_backend_caps: dict = {}
+_UNSUPPORTED_STATUS = (404, 405, 501)
+
+
+def _flujo(metodo):
+    """
+    Los métodos con lógica alrededor de la petición se escriben una sola vez
+    como generadores que ceden lo que necesitan y reciben el resultado:
+
+    - una llamada (callable o tupla (callable, *args), como en `gather`),
+    - una lista de llamadas, que se ejecutan en paralelo con `gather`,
+    - un Future de otra descarga en curso, que se espera.
+
+    ApiClient los ejecuta con su transporte bloqueante y AsyncApiClient con el
+    suyo (ver `_run`), así caché, invalidación y reportes no se duplican.
+    """
+    @functools.wraps(metodo)
+    def wrapper(self, *args, **kwargs):
+        return self._run(metodo(self, *args, **kwargs))
+    return wrapper
+
+
+def backend_url() -> str:
+    raw_url = os.environ.get("BACKEND_URL", "https://gestor-de-laboratorios-production.up.railway.app")
+    if not raw_url.startswith("http://") and not raw_url.startswith("https://"):
+        return f"https://{raw_url}"
+    return raw_url
+
+
+def _reglas_batch_payload(ops: list[tuple]) -> dict:
+    """Cada entrada lleva `indice` (su posición en `ops`) para casar la respuesta."""
+    return {
+        "crear": [{"indice": i, **payload} for i, (accion, _, payload) in enumerate(ops) if accion == "crear"],
+        "actualizar": [{"indice": i, "id": rid, **payload} for i, (accion, rid, payload) in enumerate(ops) if accion == "actualizar"],
+        "eliminar": [{"indice": i, "id": rid} for i, (accion, rid, _) in enumerate(ops) if accion == "eliminar"],
+    }
+
+
+def _reglas_batch_results(ops: list[tuple], result) -> list | None:
+    """
+    Resultado por operación de una respuesta del endpoint masivo. Se espera
+    {"resultados": [...]} donde cada resultado repite el `indice` de su
+    operación (o, en actualizar/eliminar, al menos el `id` de la regla). Un
+    error global se reparte a todas las operaciones; una operación sin
+    resultado cuenta como fallida. None si la respuesta no tiene esa forma.
+    """
+    if isinstance(result, dict) and "error" in result:
+        return [result] * len(ops)
+    resultados = result.get("resultados") if isinstance(result, dict) else result
+    if not isinstance(resultados, list):
+        return None
+    por_id = {}
+    for i, (accion, regla_id, _) in enumerate(ops):
+        if accion != "crear" and regla_id is not None:
+            por_id.setdefault(regla_id, []).append(i)
+    por_op = [None] * len(ops)
+    for res in resultados:
+        if not isinstance(res, dict):
+            continue
+        i = res.get("indice")
+        if not (isinstance(i, int) and 0 <= i < len(ops)):
+            libres = [j for j in por_id.get(res.get("id"), ()) if por_op[j] is None]
+            i = libres[0] if libres else None
+        if i is None or por_op[i] is not None:
+            continue
+        por_op[i] = {k: v for k, v in res.items() if k != "indice"}
+    if ops and all(res is None for res in por_op):
+        return None
+    return [res if res is not None else {"error": "Respuesta inválida"} for res in por_op]
+
+
+# Campos con los que ReglasIndex y GruposReglas ubican una regla (alcance, día, horario y grupo).
+_CAMPOS_REGLA = ("laboratorio_id", "dia_semana", "hora_inicio", "hora_fin", "tipo_intervalo", "es_habilitado")
+
+
+def _regla_op_ok(accion: str, result) -> bool:
+    if not isinstance(result, dict) or "error" in result:
+        return False
+    if accion == "eliminar":
+        return result.get("success", True) is not False
+    return bool(result.get("id")) or result.get("success") is True
+
+
+def _resultado_incierto(result) -> bool:
+    """
+    Fallo sin una respuesta definitiva del backend: red, timeout, 502-504 o
+    respuesta ilegible (incluido el endpoint masivo). La operación pudo
+    haberse aplicado.
+    """
+    if not isinstance(result, dict):
+        return True
+    status = result.get("status")
+    return status is None or status in transport.RETRY_STATUS
+
+
+def _reporte_reglas(ops: list[tuple], results: list, masivo: bool = False) -> dict:
+    """
+    {"ok": {"crear": n, "actualizar": n, "eliminar": n}, "fallos": [{"accion",
+    "id", "dia_semana", "detail"}], "guardadas": [regla], "eliminadas": [id],
+    "completo": bool, "masivo": bool}. Un lote parcialmente fallido conserva
+    los éxitos: el llamador decide cómo informarlos. `guardadas`/`eliminadas`
+    permiten aplicar los cambios sin volver a pedir todas las reglas;
+    cada regla guardada es el payload enviado más lo que devolvió el backend
+    (que puede ser solo el id). `completo` es False si a alguna le faltan
+    campos de `_CAMPOS_REGLA` o si alguna operación falló sin saber si se
+    aplicó (ver `_resultado_incierto`).
+    """
+    ok = {"crear": 0, "actualizar": 0, "eliminar": 0}
+    fallos = []
+    guardadas, eliminadas = [], []
+    completo = True
+    for (accion, regla_id, payload), result in zip(ops, results):
+        if _regla_op_ok(accion, result):
+            ok[accion] += 1
+            if accion == "eliminar":
+                eliminadas.append(regla_id)
+                continue
+            regla = {"id": regla_id, **(payload or {}), **result}
+            regla.pop("success", None)
+            if regla.get("id") and all(k in regla for k in _CAMPOS_REGLA):
+                guardadas.append(regla)
+            else:
+                completo = False
+            continue
+        if isinstance(result, dict):
+            detail = result.get("error") or result.get("detail") or "Error desconocido"
+        else:
+            detail = "Respuesta inválida"
+        if _resultado_incierto(result):
+            completo = False
+        fallos.append({
+            "accion": accion,
+            "id": regla_id,
+            "dia_semana": (payload or {}).get("dia_semana"),
+            "detail": str(detail),
+        })
+    return {
+        "ok": ok,
+        "fallos": fallos,
+        "guardadas": guardadas,
+        "eliminadas": eliminadas,
+        "completo": completo,
+        "masivo": masivo,
+    }
+
 
 class ApiClient:
+    # Estado por sesión que comparte un AsyncApiClient creado con `from_sync`.
+    _ESTADO_SESION = (
+        "cookies", "_ocupacion_cache", "_agenda", "_users_cache", "_reglas_cache", "_recursos_cache",
+        "_horario_verificado", "_permisos",
+    )
+
     def __init__(self, page: ft.Page):
         self.page = page
-        self.session = requests.Session()
-        raw_url = os.environ.get("BACKEND_URL", "https://gestor-de-laboratorios-production.up.railway.app")
-        if not raw_url.startswith("http://") and not raw_url.startswith("https://"):
-            self.base_url = f"https://{raw_url}"
-        else:
-            self.base_url = raw_url
+        self.session = transport.shared_session()
+        # Cookies de este usuario (el captcha se liga al login por cookie de sesión);
+        # el pool es compartido pero el jar no.
+        self.cookies = requests.cookies.RequestsCookieJar()
+        self._auth_token = None
+        self.base_url = backend_url()
+        self._ocupacion_cache = TTLCache(ttl=OCUPACION_TTL_SECONDS)
+        self._agenda = AgendaCache(ttl=AGENDA_TTL_SECONDS)
+        self._users_cache = TTLCache(ttl=USERS_QUERY_TTL_SECONDS, maxsize=USERS_QUERY_CACHE_SIZE)
+        self._reglas_cache = TTLCache(ttl=REGLAS_TTL_SECONDS)
+        # Laboratorios cuyo horario local coincidió con el backend usando el índice en caché.
+        self._horario_verificado: set = set()
+        # Endpoints que el backend negó a esta sesión (401/403); no se reintentan hasta el logout.
+        self._permisos: dict = {}
+        self._recursos_cache = TTLCache(ttl=RECURSOS_TTL_SECONDS, maxsize=RECURSOS_CACHE_SIZE)
+        self._aio = None
+
+    @property
+    def aio(self):
+        """
+        AsyncApiClient que comparte token y cachés con este cliente, para ir
+        migrando handlers a `async def` sin tocar el resto de la vista.
+        """
+        if self._aio is None:
+            from async_api_client import AsyncApiClient
+            self._aio = AsyncApiClient.from_sync(self)
+        return self._aio
 
     def _make_request(self, method, endpoint, **kwargs):
         url = f"{self.base_url}{endpoint}"
+        if not _breaker.allow():
+            logger.warning("Circuit breaker abierto, se omite %s %s", method, url)
+            return {"error": "El servidor backend no responde. Intenta de nuevo en unos segundos."}
+
+        kwargs.setdefault("timeout", transport.timeout_for(endpoint))
+        kwargs["headers"] = {**self._auth_headers(), **(kwargs.get("headers") or {})}
+        kwargs["cookies"] = self.cookies
+        retries = transport.MAX_RETRIES if method.upper() in transport.IDEMPOTENT_METHODS else 0
+        inicio = time.monotonic()
         try:
-            response = self.session.request(method, url, **kwargs)
-            print(f"📡 Request: {method} {url} - Status: {response.status_code}")
+            for attempt in range(retries + 1):
+                started = time.perf_counter()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                    # El jar de la sesión compartida no guarda nada: las cookies se copian al de este cliente.
+                    for r in (*response.history, response):
+                        self.cookies.update(r.cookies)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    is_timeout = isinstance(e, requests.exceptions.Timeout)
+                    telemetry.record(method, endpoint, "timeout" if is_timeout else "connection", time.perf_counter() - started)
+                    delay = transport.retry_delay(attempt, retries, inicio)
+                    if delay is not None and _breaker.allow():
+                        time.sleep(delay)
+                        continue
+                    # Un fallo por petición; una lectura lenta es de ese endpoint, no "backend caído".
+                    if not isinstance(e, requests.exceptions.ReadTimeout):
+                        _breaker.record_failure()
+                    if is_timeout:
+                        return {"error": "El servidor backend tardó demasiado en responder"}
+                    return {"error": "No se pudo conectar con el servidor backend"}
+                telemetry.record(method, endpoint, response.status_code, time.perf_counter() - started, len(response.content))
+
+                if response.status_code in transport.RETRY_STATUS:
+                    delay = transport.retry_delay(attempt, retries, inicio)
+                    if delay is not None and _breaker.allow():
+                        time.sleep(delay)
+                        continue
+                    _breaker.record_failure()
+                else:
+                    _breaker.record_success()
+                break
+
             if response.status_code in [200, 201]:
                 return response.json()
             if response.status_code == 204:
                 return {"success": True}
-            print(f"❌ Error {response.status_code}: {response.text}")
+            logger.debug("Error %s en %s: %.500s", response.status_code, url, response.text)
             try:
                 error_json = response.json()
-                return {"error": error_json.get("detail", response.text)}
+                return {"error": error_json.get("detail", response.text), "status": response.status_code}
             except requests.exceptions.JSONDecodeError:
-                return {"error": f"Error {response.status_code}: {response.text}"}
-        except requests.exceptions.ConnectionError:
-            print(f"❌ Error de conexión con el backend en {url}")
-            return {"error": "No se pudo conectar con el servidor backend"}
+                return {"error": f"Error {response.status_code}: {response.text}", "status": response.status_code}
         except requests.exceptions.RequestException as e:
-            print(f"❌ Error en request: {e}")
+            logger.warning("Error en request %s %s: %s", method, url, e)
             return {"error": str(e)}
         except Exception as e:
-            print(f"❌ Error inesperado: {e}")
+            logger.exception("Error inesperado en %s %s: %s", method, url, e)
             return {"error": "Error inesperado en la conexión"}
 
+    def _peticion(self, method, endpoint, **kwargs):
+        """Paso de un flujo: la petición a `endpoint` con el transporte del cliente."""
+        return functools.partial(self._make_request, method, endpoint, **kwargs)
+
+    def _run(self, flujo):
+        resultado = None
+        try:
+            while True:
+                paso = flujo.send(resultado)
+                if isinstance(paso, list):
+                    resultado = self.gather(*paso)
+                elif isinstance(paso, Future):
+                    resultado = paso.result()
+                else:
+                    fn, *args = paso if isinstance(paso, tuple) else (paso,)
+                    resultado = fn(*args)
+        except StopIteration as fin:
+            return fin.value
+
+    def _auth_headers(self) -> dict:
+        return {"Authorization": self._auth_token} if self._auth_token else {}
+
+    def clear_auth(self):
+        self._auth_token = None
+        self.cookies.clear()
+        self._ocupacion_cache.clear()
+        self._agenda.clear()
+        self._users_cache.clear()
+        self._reglas_cache.clear()
+        self._horario_verificado.clear()
+        self._permisos.clear()
+        self._recursos_cache.clear()
+
+    def gather(self, *calls):
+        """
+        Ejecuta llamadas independientes en paralelo y devuelve sus resultados en
+        el mismo orden. Cada llamada es un callable o una tupla (callable, *args).
+        Una excepción se devuelve como {"error": ...} en su posición, igual que
+        _make_request.
+        """
+        def run(call):
+            fn, *args = call if isinstance(call, tuple) else (call,)
+            try:
+                return fn(*args)
+            except Exception as e:
+                logger.exception("Error en llamada concurrente %s: %s", getattr(fn, "__name__", fn), e)
+                return {"error": str(e)}
+
+        # Dentro de un worker del pool se ejecuta en serie para no bloquearlo esperando a sí mismo;
+        # en una precarga también, para no ocupar el pool de primer plano.
+        if len(calls) <= 1 or threading.current_thread().name.startswith((_POOL_THREAD_PREFIX, _PREFETCH_THREAD_PREFIX)):
+            return [run(c) for c in calls]
+        futures = [_executor.submit(run, c) for c in calls]
+        return [f.result() for f in futures]
+
+    @_flujo
+    def _get_catalog(self, key: str, endpoint: str):
+        cached = _catalog_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        version = _catalog_cache.version
+        data = yield self._peticion("GET", endpoint)
+        if isinstance(data, list):
+            _catalog_cache.set(key, data, version)
+            return list(data)
+        return data
+
+    @_flujo
+    def get_catalogo(self):
+        """Catalogo indexado (planteles + laboratorios), o el dict de error del primero que falle."""
+        catalogo = _catalog_cache.get("catalogo")
+        if catalogo is not None:
+            return catalogo
+        # Si se invalida mientras se descarga, este Catalogo se devuelve pero no se guarda.
+        version = _catalog_cache.version
+        planteles, labs = yield [self.get_planteles, self.get_laboratorios]
+        if not isinstance(planteles, list):
+            detail = planteles.get("error", "Error") if isinstance(planteles, dict) else "Respuesta inválida"
+            return {"error": detail, "catalogo": "planteles"}
+        if not isinstance(labs, list):
+            detail = labs.get("error", "Error") if isinstance(labs, dict) else "Respuesta inválida"
+            return {"error": detail, "catalogo": "laboratorios"}
+        catalogo = Catalogo(planteles, labs)
+        _catalog_cache.set("catalogo", catalogo, version)
+        return catalogo
+
+    def invalidate_catalogs(self, *keys: str):
+        if keys:
+            if {"planteles", "laboratorios"} & set(keys):
+                keys = keys + ("catalogo",)
+            _catalog_cache.invalidate(*keys)
+        else:
+            _catalog_cache.clear()
+
+    def catalog_cache_stats(self) -> dict:
+        return _catalog_cache.stats()
+
+    def metrics_snapshot(self) -> dict:
+        """Métricas del proceso (todas las sesiones) para el panel de administración."""
+        return {
+            "endpoints": telemetry.snapshot(),
+            "catalog_cache": _catalog_cache.stats(),
+            "breaker": _breaker.state,
+        }
+
+    def metrics_text(self) -> str:
+        return telemetry.render_text()
+
+    @_flujo
     def get_captcha_image(self):
-        response = self._make_request("GET", "/captcha")
+        response = yield self._peticion("GET", "/captcha")
         if response and "image_data" in response:
             return response.get("image_data")
-        print(f"❌ Error obteniendo CAPTCHA: {response}")
+        logger.warning("Error obteniendo CAPTCHA: %.300r", response)
         return None
 
+    @_flujo
     def login(self, username, password, captcha):
-        response_data = self._make_request("POST", "/token", json={"username": username, "password": password, "captcha": captcha})
+        response_data = yield self._peticion("POST", "/token", json={"username": username, "password": password, "captcha": captcha})
         if response_data and "access_token" in response_data:
-            token_val = f"Bearer {response_data.get('access_token')}"
-            self.session.headers.update({"Authorization": token_val})
+            self._auth_token = f"Bearer {response_data.get('access_token')}"
         return response_data
 
+    @_flujo
     def login_with_google(self, google_id_token: str):
-        response_data = self._make_request("POST", "/auth/google-token", json={"idToken": google_id_token})
+        response_data = yield self._peticion("POST", "/auth/google-token", json={"idToken": google_id_token})
         if response_data and "access_token" in response_data:
-            token_val = f"Bearer {response_data.get('access_token')}"
-            self.session.headers.update({"Authorization": token_val})
+            self._auth_token = f"Bearer {response_data.get('access_token')}"
         return response_data
 
     def register(self, user_data: dict):
         return self._make_request("POST", "/register", json=user_data)
 
     def get_laboratorios(self):
-        return self._make_request("GET", "/laboratorios")
+        return self._get_catalog("laboratorios", "/laboratorios")
 
     def get_laboratorio(self, lab_id):
         return self._make_request("GET", f"/laboratorios/{lab_id}")
 
+    @_flujo
     def create_laboratorio(self, data):
-        return self._make_request("POST", "/laboratorios", json=data)
+        result = yield self._peticion("POST", "/laboratorios", json=data)
+        self.invalidate_catalogs("laboratorios")
+        return result
 
+    @_flujo
     def update_laboratorio(self, lab_id, data):
-        return self._make_request("PUT", f"/laboratorios/{lab_id}", json=data)
+        result = yield self._peticion("PUT", f"/laboratorios/{lab_id}", json=data)
+        self.invalidate_catalogs("laboratorios")
+        return result
 
+    @_flujo
     def delete_laboratorio(self, lab_id):
-        return self._make_request("DELETE", f"/laboratorios/{lab_id}")
+        result = yield self._peticion("DELETE", f"/laboratorios/{lab_id}")
+        self.invalidate_catalogs("laboratorios")
+        return result
 
     def get_reservas(self, lab_id: int, start_dt: date, end_dt: date):
         params = {"start_dt": str(start_dt), "end_dt": str(end_dt)}
         return self._make_request("GET", f"/reservas/{lab_id}", params=params)
 
+    @_flujo
     def create_reserva(self, data):
-        return self._make_request("POST", "/reservas", json=data)
+        result = yield self._peticion("POST", "/reservas", json=data)
+        self._invalidar_agenda(data)
+        return result
 
+    @_flujo
     def update_reserva(self, reserva_id, data):
-        return self._make_request("PUT", f"/reservas/{reserva_id}", json=data)
+        result = yield self._peticion("PUT", f"/reservas/{reserva_id}", json=data)
+        self._invalidar_agenda(data, reserva_id)
+        return result
 
+    @_flujo
     def delete_reserva(self, reserva_id):
-        return self._make_request("PUT", f"/reservas/{reserva_id}/cancelar")
+        result = yield self._peticion("PUT", f"/reservas/{reserva_id}/cancelar")
+        self._invalidar_agenda(None, reserva_id)
+        return result
+
+    def _invalidar_agenda(self, data: dict = None, reserva_id=None):
+        conocida = reserva_id is None or self._agenda.invalidar_reserva(reserva_id)
+        lab_id = (data or {}).get("laboratorio_id")
+        try:
+            inicio = datetime.fromisoformat(str((data or {}).get("inicio")))
+        except ValueError:
+            inicio = None
+        if lab_id is not None and inicio is not None:
+            self._agenda.invalidar_dia(int(lab_id), inicio.date())
+        elif not conocida:
+            self._agenda.clear()
+
+    def _invalidar_horario(self):
+        """Tras cambiar reglas: la agenda y el índice de reglas de la sesión ya no valen."""
+        self._reglas_cache.clear()
+        self._horario_verificado.clear()
+        self._agenda.clear()
+
+    def _indice_reglas(self, reglas) -> ReglasIndex | None:
+        """Guarda el índice de reglas de la sesión; sin permiso se recuerda para no volver a pedirlas."""
+        if isinstance(reglas, dict) and reglas.get("status") in (401, 403):
+            self._permisos["reglas"] = False
+            return None
+        if not isinstance(reglas, list):
+            return None
+        indice = ReglasIndex(reglas)
+        self._reglas_cache.set("indice", indice)
+        # Un índice nuevo se vuelve a verificar por laboratorio antes de usarlo.
+        self._horario_verificado.clear()
+        return indice
+
+    def _reglas_permitidas(self) -> bool:
+        if self._permisos.get("reglas") is False:
+            return False
+        user = self.page.session.get("user_session") if self.page is not None else None
+        rol = (user or {}).get("rol")
+        return rol is None or rol == "admin"
+
+    @_flujo
+    def _cargar_indice_reglas(self):
+        return self._indice_reglas((yield self.get_reglas_horario))
+
+    def _verificar_horario_local(self, indice: ReglasIndex, lab_id: int, rango: list[date], horario: dict, fresco: bool):
+        """Compara el horario materializado con el del backend y decide si se puede usar el local."""
+        diferencia = diferencia_horario(materializar(indice, lab_id, rango), horario, rango)
+        if diferencia is None:
+            self._horario_verificado.add(lab_id)
+            return
+        self._reglas_cache.clear()
+        self._horario_verificado.clear()
+        if fresco:
+            # Con reglas recién descargadas no es un problema de caché: el cálculo no coincide.
+            _backend_caps["horario_local"] = False
+            logger.warning("Horario local distinto al del backend (%s); se usa siempre el del backend.", diferencia)
+
+    def _horario_local(self, lab_id: int):
+        """(índice, usable): índice en caché (o None si hay que pedirlo) y si ya se verificó para `lab_id`."""
+        if not HORARIO_LOCAL or _backend_caps.get("horario_local") is False or not self._reglas_permitidas():
+            return False, False
+        indice = self._reglas_cache.get("indice")
+        return indice, indice is not None and lab_id in self._horario_verificado
+
+    @_flujo
+    def _fetch_agenda(self, lab_id: int, days: list[date], usuario: dict = None):
+        """
+        Una descarga que cubre `days`; se guarda por día. Con las reglas en
+        caché y el laboratorio ya verificado solo se piden las reservas y el
+        horario se materializa localmente; si no, horario + reservas en paralelo.
+        """
+        d0, d1 = min(days), max(days)
+        rango = [d0 + timedelta(days=i) for i in range((d1 - d0).days + 1)]
+        version = self._agenda.version
+        indice, local = self._horario_local(lab_id)
+        if local:
+            reservas = yield (self.get_reservas, lab_id, d0, d1 + timedelta(days=1))
+            horario = materializar(indice, lab_id, rango)
+        else:
+            calls = [
+                (self.get_horario_laboratorio, lab_id, d0, d1),
+                (self.get_reservas, lab_id, d0, d1 + timedelta(days=1)),
+            ]
+            if indice is None:
+                calls.append(self._cargar_indice_reglas)
+            horario, reservas, *nuevo = yield calls
+            if nuevo:
+                indice = nuevo[0]
+            if indice and isinstance(horario, dict) and "error" not in horario:
+                self._verificar_horario_local(indice, lab_id, rango, horario, fresco=bool(nuevo))
+        if not isinstance(horario, dict) or "error" in horario:
+            detail = horario.get("error") if isinstance(horario, dict) else "Respuesta inesperada"
+            return {"error": detail, "agenda": "horario"}
+        if not isinstance(reservas, list):
+            detail = reservas.get("error", "Error") if isinstance(reservas, dict) else "Error"
+            return {"error": detail, "agenda": "reservas"}
+        return self._agenda.guardar(lab_id, rango, horario, reservas, version, usuario)
+
+    @_flujo
+    def get_agenda(self, lab_id: int, days: list[date], usuario: dict = None):
+        """
+        {date: agenda.DiaAgenda} para los días pedidos. Solo descarga los que
+        no están en caché; si una precarga ya los está trayendo, la espera.
+        `usuario` (el de la sesión) decide `Reserva.puede_gestionar`.
+        En error devuelve {"error": ..., "agenda": "horario"|"reservas"}.
+        """
+        dias = {d: self._agenda.get(lab_id, d) for d in days}
+        faltan = [d for d, dia in dias.items() if dia is None]
+        for future in set(self._agenda.en_vuelo(lab_id, faltan).values()):
+            yield future
+        for d in faltan:
+            dias[d] = self._agenda.get(lab_id, d)
+        faltan = [d for d, dia in dias.items() if dia is None]
+        if faltan:
+            descargados = yield (self._fetch_agenda, lab_id, faltan, usuario)
+            if "error" in descargados:
+                return descargados
+            dias.update({d: descargados[d] for d in faltan})
+        return dias
+
+    def _reservar_precarga(self, lab_id: int, days: list[date]):
+        """
+        (future, días) que esta precarga debe descargar, o None si no falta
+        ninguno. Se llama cuando la precarga empieza, no al encolarla: una
+        precarga en cola no está en vuelo y nadie espera por ella.
+        """
+        faltan = [d for d in days if self._agenda.get(lab_id, d) is None]
+        if not faltan:
+            return None
+        future, propios = self._agenda.reservar_vuelo(lab_id, faltan)
+        return (future, propios) if propios else None
+
+    def prefetch_agenda(self, lab_id: int, days: list[date], usuario: dict = None):
+        """Precarga en segundo plano los días que falten; no bloquea ni reporta errores."""
+        if all(self._agenda.get(lab_id, d) is not None for d in days):
+            return
+
+        def run():
+            reserva = self._reservar_precarga(lab_id, days)
+            if reserva is None:
+                return
+            future, propios = reserva
+            try:
+                self._fetch_agenda(lab_id, propios, usuario)
+            except Exception as e:
+                logger.warning("Error precargando agenda del laboratorio %s: %s", lab_id, e)
+            finally:
+                self._agenda.terminar_vuelo(lab_id, propios, future)
+
+        _prefetch_executor.submit(run)
 
     def get_horario_laboratorio(self, lab_id: int, start_dt: date, end_dt: date):
         params = {"fecha_inicio": str(start_dt), "fecha_fin": str(end_dt)}
@@ -103,13 +653,20 @@ class ApiClient:
     def get_todos_los_prestamos(self):
         return self._make_request("GET", "/admin/prestamos")
 
+    @_flujo
     def create_prestamo(self, data: dict):
-        return self._make_request("POST", "/prestamos", json=data)
+        result = yield self._peticion("POST", "/prestamos", json=data)
+        self._ocupacion_cache.clear()
+        return result
 
+    @_flujo
     def update_prestamo_estado(self, prestamo_id: int, new_status: str):
-        return self._make_request("PUT", f"/admin/prestamos/{prestamo_id}/estado?nuevo_estado={new_status}")
+        result = yield self._peticion("PUT", f"/admin/prestamos/{prestamo_id}/estado?nuevo_estado={new_status}")
+        self._ocupacion_cache.clear()
+        self._recursos_cache.clear()  # entregado/devuelto cambia el estado del recurso
+        return result
 
-    def get_recursos(self, plantel_id: int = None, lab_id: int = None, estado: str = "", tipo: str = ""):
+    def _recursos_params(self, plantel_id, lab_id, estado: str, tipo: str) -> dict:
         params = {}
         if plantel_id:
             params["plantel_id"] = plantel_id
@@ -119,49 +676,122 @@ class ApiClient:
             params["estado"] = estado
         if tipo:
             params["tipo"] = tipo
-        return self._make_request("GET", "/recursos", params=params)
+        return params
+
+    @_flujo
+    def get_recursos(self, plantel_id: int = None, lab_id: int = None, estado: str = "", tipo: str = "",
+                     offset: int = 0, limit: int = None):
+        """Recursos que coinciden con los filtros; con `limit`, solo la página [offset, offset+limit)."""
+        params = self._recursos_params(plantel_id, lab_id, estado, tipo)
+        paged = limit is not None and RECURSOS_SERVER_PAGING
+        key = tuple(sorted(params.items())) + ((offset, limit) if paged else ())
+        recursos = self._recursos_cache.get(key)
+        if recursos is None:
+            if paged:
+                params.update(offset=offset, limit=limit)
+            recursos = yield self._peticion("GET", "/recursos", params=params)
+            if not isinstance(recursos, list):
+                return recursos
+            self._recursos_cache.set(key, recursos)
+        if limit is not None and not paged:
+            return recursos[offset:offset + limit]
+        return recursos
+
+    @_flujo
+    def get_inventario(self):
+        """Inventario completo indexado por plantel/lab/estado/tipo, o el dict de error."""
+        inventario = self._recursos_cache.get("inventario")
+        if inventario is not None:
+            return inventario
+        recursos, catalogo = yield [self.get_recursos, self.get_catalogo]
+        if not isinstance(recursos, list):
+            return recursos
+        inventario = Inventario(recursos, catalogo if isinstance(catalogo, Catalogo) else None)
+        self._recursos_cache.set("inventario", inventario)
+        return inventario
 
     def get_recurso_tipos(self):
-        return self._make_request("GET", "/recursos/tipos")
+        return self._get_catalog("recurso_tipos", "/recursos/tipos")
 
+    @_flujo
     def create_recurso(self, tipo: str, estado: str, laboratorio_id: int, specs: str):
         payload = {"tipo": tipo, "estado": estado, "laboratorio_id": laboratorio_id, "specs": specs}
-        return self._make_request("POST", "/recursos", json=payload)
+        result = yield self._peticion("POST", "/recursos", json=payload)
+        self.invalidate_catalogs("recurso_tipos")
+        self._recursos_cache.clear()
+        return result
 
+    @_flujo
     def update_recurso(self, recurso_id: int, tipo: str, estado: str, laboratorio_id: int, specs: str):
         payload = {"tipo": tipo, "estado": estado, "laboratorio_id": laboratorio_id, "specs": specs}
-        return self._make_request("PUT", f"/recursos/{recurso_id}", json=payload)
+        result = yield self._peticion("PUT", f"/recursos/{recurso_id}", json=payload)
+        self.invalidate_catalogs("recurso_tipos")
+        self._recursos_cache.clear()
+        return result
 
+    @_flujo
     def delete_recurso(self, recurso_id: int):
-        return self._make_request("DELETE", f"/recursos/{recurso_id}")
+        result = yield self._peticion("DELETE", f"/recursos/{recurso_id}")
+        self._recursos_cache.clear()
+        return result
 
     def get_planteles(self):
-        return self._make_request("GET", "/planteles")
+        return self._get_catalog("planteles", "/planteles")
 
+    @_flujo
     def create_plantel(self, data):
-        return self._make_request("POST", "/planteles", json=data)
+        result = yield self._peticion("POST", "/planteles", json=data)
+        self.invalidate_catalogs("planteles")
+        return result
 
-    def get_users(self, q: str = "", rol: str = None):
+    def _users_params(self, q: str, rol: str | None) -> dict:
         params = {}
         if q:
             params["q"] = q
         if rol is not None:
             params["rol"] = rol
-        return self._make_request("GET", "/usuarios", params=params)
-
+        return params
+
+    @_flujo
+    def get_users(self, q: str = "", rol: str = None, offset: int = 0, limit: int = None):
+        """Usuarios que coinciden con q/rol; con `limit`, solo la página [offset, offset+limit)."""
+        paged = limit is not None and USERS_SERVER_PAGING
+        key = (q or "", rol, offset, limit) if paged else (q or "", rol)
+        users = self._users_cache.get(key)
+        if users is None:
+            params = self._users_params(q, rol)
+            if paged:
+                params.update(offset=offset, limit=limit)
+            users = yield self._peticion("GET", "/usuarios", params=params)
+            if not isinstance(users, list):
+                return users
+            self._users_cache.set(key, users)
+        if limit is not None and not paged:
+            return users[offset:offset + limit]
+        return users
+
+    @_flujo
     def update_profile(self, nombre: str, user: str, correo: str):
         payload = {"nombre": nombre, "user": user, "correo": correo}
-        return self._make_request("PUT", "/usuarios/me/profile", json=payload)
+        result = yield self._peticion("PUT", "/usuarios/me/profile", json=payload)
+        self._users_cache.clear()
+        return result
 
     def change_password(self, old_password: str, new_password: str):
         payload = {"old_password": old_password, "new_password": new_password}
         return self._make_request("PUT", "/usuarios/me/password", json=payload)
 
+    @_flujo
     def update_user_by_admin(self, user_id: int, data: dict):
-        return self._make_request("PUT", f"/usuarios/{user_id}", json=data)
+        result = yield self._peticion("PUT", f"/usuarios/{user_id}", json=data)
+        self._users_cache.clear()
+        return result
 
+    @_flujo
     def delete_user(self, user_id: int):
-        return self._make_request("DELETE", f"/usuarios/{user_id}")
+        result = yield self._peticion("DELETE", f"/usuarios/{user_id}")
+        self._users_cache.clear()
+        return result
 
     def get_reglas_horario(self, laboratorio_id: int = None):
         params = {}
@@ -169,39 +799,94 @@ class ApiClient:
             params["laboratorio_id"] = laboratorio_id
         return self._make_request("GET", "/admin/horarios/reglas", params=params)
 
+    @_flujo
     def create_regla_horario(self, payload: dict):
-        return self._make_request("POST", "/admin/horarios/reglas", json=payload)
+        result = yield self._peticion("POST", "/admin/horarios/reglas", json=payload)
+        self._invalidar_horario()
+        return result
 
+    @_flujo
     def update_regla_horario(self, regla_id: int, payload: dict):
-        return self._make_request("PUT", f"/admin/horarios/reglas/{regla_id}", json=payload)
+        result = yield self._peticion("PUT", f"/admin/horarios/reglas/{regla_id}", json=payload)
+        self._invalidar_horario()
+        return result
 
+    @_flujo
     def delete_regla_horario(self, regla_id: int):
-        return self._make_request("DELETE", f"/admin/horarios/reglas/{regla_id}")
-
-    def delete_plantel(self, plantel_id: int) -> bool:
-        try:
-            response = self.session.delete(f"{self.base_url}/planteles/{plantel_id}")
-            if response.status_code == 200:
-                return True
-            elif response.status_code == 404:
-                print(f"❌ Plantel con ID {plantel_id} no encontrado")
-                return False
+        result = yield self._peticion("DELETE", f"/admin/horarios/reglas/{regla_id}")
+        self._invalidar_horario()
+        return result
+
+    def _regla_op_call(self, op: tuple):
+        accion, regla_id, payload = op
+        if accion == "crear":
+            return (self.create_regla_horario, payload)
+        if accion == "actualizar":
+            return (self.update_regla_horario, regla_id, payload)
+        return (self.delete_regla_horario, regla_id)
+
+    @_flujo
+    def batch_reglas_horario(self, ops: list[tuple]) -> dict:
+        """
+        Aplica varias operaciones sobre reglas de horario de una vez. Cada
+        operación es ("crear", None, payload), ("actualizar", id, payload) o
+        ("eliminar", id, payload|None); en "eliminar" el payload solo se usa para
+        el reporte. Usa el endpoint masivo si el backend lo tiene;
+        si no, lanza las peticiones en paralelo. Devuelve el reporte de
+        `_reporte_reglas` (éxitos por acción y fallos con su detalle).
+        """
+        if not ops:
+            return _reporte_reglas([], [])
+        if _backend_caps.get("reglas_batch") is not False:
+            result = yield self._peticion("POST", REGLAS_BATCH_ENDPOINT, json=_reglas_batch_payload(ops))
+            if isinstance(result, dict) and result.get("status") in _UNSUPPORTED_STATUS:
+                _backend_caps["reglas_batch"] = False
             else:
-                print(f"❌ Error al eliminar plantel: {response.status_code}")
-                return False
-        except Exception as e:
-            print(f"❌ Excepción al eliminar plantel: {e}")
-            return False
+                results = _reglas_batch_results(ops, result)
+                if results is None:
+                    # Algo se pudo haber aplicado, pero no hay cómo saber qué: nada cuenta como éxito
+                    # y el reporte queda incompleto (el llamador recarga las reglas).
+                    logger.warning("Respuesta inválida del endpoint masivo de reglas: %.300r", result)
+                    results = [{"error": "Respuesta inválida"}] * len(ops)
+                elif not (isinstance(result, dict) and "error" in result):
+                    _backend_caps["reglas_batch"] = True
+                self._invalidar_horario()
+                return _reporte_reglas(ops, results, masivo=True)
+        results = yield [self._regla_op_call(op) for op in ops]
+        return _reporte_reglas(ops, results)
+
+    @_flujo
+    def delete_plantel(self, plantel_id: int) -> bool:
+        result = yield self._peticion("DELETE", f"/planteles/{plantel_id}")
+        # Borrar un plantel también puede arrastrar sus laboratorios.
+        self.invalidate_catalogs("planteles", "laboratorios")
+        return isinstance(result, dict) and "error" not in result
 
+    @_flujo
     def get_prestamos_activos(self, include_all: bool = True):
         activos = {"pendiente", "aprobado", "entregado"}
-        data = self.get_todos_los_prestamos() if include_all else self.get_mis_prestamos()
+        data = yield (self.get_todos_los_prestamos if include_all else self.get_mis_prestamos)
         if not isinstance(data, list):
             return []
         return [p for p in data if p.get("estado") in activos]
 
+    @_flujo
+    def get_ocupacion(self, usuario_id, include_all: bool = True) -> OcupacionRecursos:
+        """Ocupación derivada de una sola descarga de préstamos, cacheada hasta la próxima mutación."""
+        key = (usuario_id, include_all)
+        ocupacion = self._ocupacion_cache.get(key)
+        if ocupacion is not None:
+            return ocupacion
+        data = yield (self.get_todos_los_prestamos if include_all else self.get_mis_prestamos)
+        if not isinstance(data, list):
+            return OcupacionRecursos([], usuario_id)
+        ocupacion = OcupacionRecursos(data, usuario_id, solo_propios=not include_all)
+        self._ocupacion_cache.set(key, ocupacion)
+        return ocupacion
+
+    @_flujo
     def get_recursos_ocupados_ids(self, include_all: bool = True):
-        activos = self.get_prestamos_activos(include_all=include_all)
+        activos = yield (self.get_prestamos_activos, include_all)
         ids = set()
         for p in activos:
             r = p.get("recurso") or {}
@@ -0,0 +1,196 @@
+import asyncio
+import time
+from concurrent.futures import Future
+from datetime import date
+import weakref
+from http.cookiejar import CookieJar
+
+import httpx
+import flet as ft
+
+import transport
+from telemetry import logger, telemetry
+from api_client import ApiClient, _breaker
+
+# Un AsyncClient de httpx pertenece a un event loop; se comparte entre todas
+# las sesiones que corren en ese loop (el de Flet, normalmente uno solo).
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+# Referencias a tareas en segundo plano (el loop solo guarda referencias débiles).
+_tareas: set = set()
+
+
+def shared_async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        limits = httpx.Limits(max_connections=transport.POOL_MAXSIZE, max_keepalive_connections=transport.POOL_CONNECTIONS)
+        client = httpx.AsyncClient(limits=limits, cookies=CookieJar(policy=transport.NO_COOKIES_POLICY))
+        _clients[loop] = client
+    return client
+
+
+def _httpx_timeout(endpoint: str) -> httpx.Timeout:
+    connect, read = transport.timeout_for(endpoint)
+    return httpx.Timeout(read, connect=connect)
+
+
+class AsyncApiClient(ApiClient):
+    """
+    Misma superficie que ApiClient, pero cada método es una corrutina que no
+    ocupa un hilo de Flet mientras espera al backend:
+
+        async def on_click(e):
+            result = await api.aio.update_prestamo_estado(pid, "aprobado")
+
+    Solo cambian el transporte (`_make_request`, `gather`, `_run`): los
+    métodos se heredan y sus flujos corren igual en ambos clientes.
+    Comparte con ApiClient el circuit breaker y la caché de catálogos. Creado
+    con `from_sync` (o `api.aio`) usa también el token y la caché de ocupación
+    del cliente síncrono (y su jar de cookies), así que login/logout en
+    cualquiera de los dos vale para ambos.
+    """
+
+    def __init__(self, page: ft.Page, sync: ApiClient = None):
+        self._sync = None
+        self._own_token = None
+        super().__init__(page)
+        if sync:
+            self._sync = sync
+            self.base_url = sync.base_url
+            for attr in ApiClient._ESTADO_SESION:
+                setattr(self, attr, getattr(sync, attr))
+
+    @classmethod
+    def from_sync(cls, api: ApiClient) -> "AsyncApiClient":
+        return cls(api.page, sync=api)
+
+    @property
+    def aio(self):
+        return self
+
+    @property
+    def _auth_token(self):
+        return self._sync._auth_token if self._sync else self._own_token
+
+    @_auth_token.setter
+    def _auth_token(self, value):
+        if self._sync:
+            self._sync._auth_token = value
+        else:
+            self._own_token = value
+
+    async def _make_request(self, method, endpoint, **kwargs):
+        url = f"{self.base_url}{endpoint}"
+        if not _breaker.allow():
+            logger.warning("Circuit breaker abierto, se omite %s %s", method, url)
+            return {"error": "El servidor backend no responde. Intenta de nuevo en unos segundos."}
+
+        kwargs.setdefault("timeout", _httpx_timeout(endpoint))
+        kwargs["headers"] = {**self._auth_headers(), **(kwargs.get("headers") or {})}
+        retries = transport.MAX_RETRIES if method.upper() in transport.IDEMPOTENT_METHODS else 0
+        client = shared_async_client()
+        inicio = time.monotonic()
+        try:
+            for attempt in range(retries + 1):
+                started = time.perf_counter()
+                try:
+                    request = client.build_request(method, url, **kwargs)
+                    # El cliente httpx es compartido: las cookies salen y vuelven al jar de esta sesión.
+                    httpx.Cookies(self.cookies).set_cookie_header(request)
+                    response = await client.send(request)
+                    httpx.Cookies(self.cookies).extract_cookies(response)
+                except (httpx.ConnectError, httpx.TimeoutException) as e:
+                    is_timeout = isinstance(e, httpx.TimeoutException)
+                    telemetry.record(method, endpoint, "timeout" if is_timeout else "connection", time.perf_counter() - started)
+                    delay = transport.retry_delay(attempt, retries, inicio)
+                    if delay is not None and _breaker.allow():
+                        await asyncio.sleep(delay)
+                        continue
+                    # Un fallo por petición; una lectura lenta es de ese endpoint, no "backend caído".
+                    if not isinstance(e, httpx.ReadTimeout):
+                        _breaker.record_failure()
+                    if is_timeout:
+                        return {"error": "El servidor backend tardó demasiado en responder"}
+                    return {"error": "No se pudo conectar con el servidor backend"}
+                telemetry.record(method, endpoint, response.status_code, time.perf_counter() - started, len(response.content))
+
+                if response.status_code in transport.RETRY_STATUS:
+                    delay = transport.retry_delay(attempt, retries, inicio)
+                    if delay is not None and _breaker.allow():
+                        await asyncio.sleep(delay)
+                        continue
+                    _breaker.record_failure()
+                else:
+                    _breaker.record_success()
+                break
+
+            if response.status_code in [200, 201]:
+                return response.json()
+            if response.status_code == 204:
+                return {"success": True}
+            logger.debug("Error %s en %s: %.500s", response.status_code, url, response.text)
+            try:
+                error_json = response.json()
+                return {"error": error_json.get("detail", response.text), "status": response.status_code}
+            except ValueError:
+                return {"error": f"Error {response.status_code}: {response.text}", "status": response.status_code}
+        except httpx.HTTPError as e:
+            logger.warning("Error en request %s %s: %s", method, url, e)
+            return {"error": str(e)}
+        except Exception as e:
+            logger.exception("Error inesperado en %s %s: %s", method, url, e)
+            return {"error": "Error inesperado en la conexión"}
+
+    async def gather(self, *calls):
+        """Como ApiClient.gather, pero con asyncio.gather en vez del pool de hilos."""
+        async def run(call):
+            fn, *args = call if isinstance(call, tuple) else (call,)
+            try:
+                result = fn(*args)
+                return await result if asyncio.iscoroutine(result) else result
+            except Exception as e:
+                logger.exception("Error en llamada concurrente %s: %s", getattr(fn, "__name__", fn), e)
+                return {"error": str(e)}
+
+        return list(await asyncio.gather(*(run(c) for c in calls)))
+
+    async def _run(self, flujo):
+        """Ejecuta un flujo de ApiClient (ver api_client._flujo) esperando cada paso."""
+        resultado = None
+        try:
+            while True:
+                paso = flujo.send(resultado)
+                if isinstance(paso, list):
+                    resultado = await self.gather(*paso)
+                elif isinstance(paso, Future):
+                    resultado = await asyncio.wrap_future(paso)
+                else:
+                    fn, *args = paso if isinstance(paso, tuple) else (paso,)
+                    resultado = fn(*args)
+                    if asyncio.iscoroutine(resultado):
+                        resultado = await resultado
+        except StopIteration as fin:
+            return fin.value
+
+    def prefetch_agenda(self, lab_id: int, days: list[date], usuario: dict = None):
+        """Como ApiClient.prefetch_agenda, pero como tarea del event loop actual."""
+        if all(self._agenda.get(lab_id, d) is not None for d in days):
+            return
+
+        async def run():
+            reserva = self._reservar_precarga(lab_id, days)
+            if reserva is None:
+                return
+            future, propios = reserva
+            try:
+                await self._fetch_agenda(lab_id, propios, usuario)
+            except Exception as e:
+                logger.warning("Error precargando agenda del laboratorio %s: %s", lab_id, e)
+            finally:
+                self._agenda.terminar_vuelo(lab_id, propios, future)
+
+        task = asyncio.get_running_loop().create_task(run())
+        _tareas.add(task)
+        task.add_done_callback(_tareas.discard)
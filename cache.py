@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Caché en memoria con expiración por tiempo (TTL) y límite opcional de
+    entradas (LRU). Es segura entre hilos: Flet atiende cada sesión en su
+    propio hilo y varias sesiones comparten la misma instancia.
+
+    `version` sube con cada invalidación: quien descarga un valor la lee antes
+    y la pasa a `set`, así una invalidación que llegó durante la descarga no
+    queda tapada por el valor viejo (igual que AgendaCache).
+    """
+
+    _MISSING = object()
+
+    def __init__(self, ttl: float | None = None, maxsize: int | None = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and (time.monotonic() - stored_at) > self.ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING or self._expired(entry[0]):
+                if entry is not self._MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def set(self, key, value, version: int | None = None):
+        """Guarda `value`; con `version`, no lo guarda si hubo una invalidación desde entonces."""
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._version += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            return entry is not self._MISSING and not self._expired(entry[0])
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "size": len(self._data),
+            }
@@ -0,0 +1,55 @@
+def _id_key(value):
+    """Normaliza ids que llegan como int del API o como str desde los Dropdown."""
+    if isinstance(value, str):
+        value = value.strip()
+        return int(value) if value.isdigit() else None
+    return value
+
+
+class Catalogo:
+    """
+    Índices por id de planteles y laboratorios, más el join laboratorio→plantel.
+    Se construye una vez por carga de catálogos (ver ApiClient.get_catalogo) y
+    se comparte entre sesiones, así que debe tratarse como de solo lectura.
+    """
+
+    def __init__(self, planteles: list[dict], laboratorios: list[dict]):
+        self.planteles = [p for p in planteles if isinstance(p, dict) and p.get("id") is not None]
+        self.laboratorios = [l for l in laboratorios if isinstance(l, dict) and l.get("id") is not None]
+
+        self.plantel_by_id: dict[int, dict] = {p["id"]: p for p in self.planteles}
+        self.lab_by_id: dict[int, dict] = {l["id"]: l for l in self.laboratorios}
+
+        self.labs_by_plantel: dict[int, list[dict]] = {}
+        self.plantel_by_lab: dict[int, dict] = {}
+        for lab in self.laboratorios:
+            pid = lab.get("plantel_id")
+            self.labs_by_plantel.setdefault(pid, []).append(lab)
+            plantel = self.plantel_by_id.get(pid)
+            if plantel is not None:
+                self.plantel_by_lab[lab["id"]] = plantel
+
+    def lab(self, lab_id) -> dict:
+        return self.lab_by_id.get(_id_key(lab_id)) or {}
+
+    def plantel(self, plantel_id) -> dict:
+        return self.plantel_by_id.get(_id_key(plantel_id)) or {}
+
+    def plantel_de_lab(self, lab_id) -> dict:
+        return self.plantel_by_lab.get(_id_key(lab_id)) or {}
+
+    def labs_de_plantel(self, plantel_id) -> list[dict]:
+        return self.labs_by_plantel.get(_id_key(plantel_id), [])
+
+    def lab_nombre(self, lab_id, default: str = "-") -> str:
+        return self.lab(lab_id).get("nombre", default)
+
+    def ubicacion(self, lab_id) -> tuple[str, str]:
+        """Devuelve (plantel_nombre, lab_nombre) a partir de laboratorio_id."""
+        if lab_id is None:
+            return ("-", "-")
+        lab = self.lab(lab_id)
+        lab_nombre = lab.get("nombre", f"Lab #{lab_id}")
+        plantel_id = lab.get("plantel_id")
+        plantel_nombre = self.plantel(plantel_id).get("nombre", f"Plantel #{plantel_id}" if plantel_id else "-")
+        return (plantel_nombre, lab_nombre)
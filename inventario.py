@@ -0,0 +1,49 @@
+from catalogo import Catalogo
+
+
+class Inventario:
+    """
+    Inventario completo de recursos (una descarga de /recursos sin filtros)
+    con índices secundarios por plantel, laboratorio, estado y tipo, para
+    responder cualquier combinación de filtros en memoria intersectando sets.
+
+    El plantel sale del laboratorio vía Catalogo. Se construye por sesión
+    (ver ApiClient.get_inventario) y se descarta cuando el inventario cambia.
+    """
+
+    def __init__(self, recursos: list[dict], catalogo: Catalogo | None = None):
+        self.recursos = [r for r in recursos if isinstance(r, dict) and r.get("id") is not None]
+        self._pos: dict = {r["id"]: i for i, r in enumerate(self.recursos)}
+
+        self.por_plantel: dict[int, set] = {}
+        self.por_lab: dict[int, set] = {}
+        self.por_estado: dict[str, set] = {}
+        self.por_tipo: dict[str, set] = {}
+        for r in self.recursos:
+            rid, lab_id = r["id"], r.get("laboratorio_id")
+            self.por_lab.setdefault(lab_id, set()).add(rid)
+            self.por_estado.setdefault(r.get("estado"), set()).add(rid)
+            self.por_tipo.setdefault(r.get("tipo"), set()).add(rid)
+            plantel = catalogo.plantel_de_lab(lab_id) if catalogo is not None else {}
+            if plantel:
+                self.por_plantel.setdefault(plantel["id"], set()).add(rid)
+
+    def filtrar(self, plantel_id=None, lab_id=None, estado: str = "", tipo: str = "") -> list[dict]:
+        """Recursos que cumplen todos los filtros dados, en el orden del backend. Vacíos = sin filtro."""
+        sets = []
+        if plantel_id:
+            sets.append(self.por_plantel.get(plantel_id, set()))
+        if lab_id:
+            sets.append(self.por_lab.get(lab_id, set()))
+        if estado:
+            sets.append(self.por_estado.get(estado, set()))
+        if tipo:
+            sets.append(self.por_tipo.get(tipo, set()))
+        if not sets:
+            return list(self.recursos)
+        sets.sort(key=len)  # empezar por el más chico acota la intersección
+        ids = sets[0].intersection(*sets[1:])
+        return [self.recursos[i] for i in sorted(self._pos[rid] for rid in ids)]
+
+    def __len__(self):
+        return len(self.recursos)
@@ -1,54 +1,21 @@
 import os
+import time
+import threading
+
+_startup_started = time.perf_counter()
+
 import flet as ft
 import sys
-import base64
 
 port = int(os.environ.get("PORT", 8501))
 
 print("=== INICIANDO APLICACIÓN ===")
-print("Estructura detectada:")
-for item in os.listdir('.'):
-    if os.path.isdir(item):
-        print(f"📁 {item}/")
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from ui.views import (
-        login_view,
-        register_view,
-        dashboard_view,
-        planteles_view,
-        laboratorios_view,
-        reservas_view,
-        prestamos_view,
-        settings_view,
-        captcha_view,
-        horarios_admin_view,
-    )
-    print("✅ Todas las vistas importadas correctamente")
-    VIEWS_AVAILABLE = True
-except ImportError as e:
-    print(f"❌ Error importando vistas: {e}")
-    VIEWS_AVAILABLE = False
-    class EmergencyView(ft.Column):
-        def __init__(self, *args, **kwargs):
-            super().__init__()
-            self.controls = [ft.Text("Sistema de Gestión de Laboratorios", size=20)]
-            self.expand = True
-            self.alignment = ft.MainAxisAlignment.CENTER
-            self.horizontal_alignment = ft.CrossAxisAlignment.CENTER
-    
-    login_view = type('login_view', (), {'LoginView': EmergencyView})()
-    register_view = type('register_view', (), {'RegisterView': EmergencyView})()
-    dashboard_view = type('dashboard_view', (), {'DashboardView': EmergencyView})()
-    planteles_view = type('planteles_view', (), {'PlantelesView': EmergencyView})()
-    laboratorios_view = type('laboratorios_view', (), {'LaboratoriosView': EmergencyView})()
-    reservas_view = type('reservas_view', (), {'ReservasView': EmergencyView})()
-    prestamos_view = type('prestamos_view', (), {'PrestamosView': EmergencyView})()
-    settings_view = type('settings_view', (), {'SettingsView': EmergencyView})()
-    captcha_view = type('captcha_view', (), {'CaptchaView': EmergencyView})()
-    horarios_admin_view = type('horarios_admin_view', (), {'HorariosAdminView': EmergencyView})()
+# Las vistas se importan al navegar a su ruta por primera vez (ver ui/routes.py).
+from ui import routes
+from ui.view_cache import ViewCache
 
 try:
     from ui.theme import apply_theme
@@ -79,45 +46,28 @@ ROUTE_META = {
 }
 NAV_WIDTH = 250
 MOBILE_BREAKPOINT = 768
+# Un arrastre del borde de la ventana dispara decenas de on_resize: se
+# agrupan y solo se procesa el último tras esta pausa.
+RESIZE_DEBOUNCE_SECONDS = float(os.environ.get("RESIZE_DEBOUNCE_SECONDS", 0.15))
 
-ICON_PATH = "ui/assets/icon.png"
-SPLASH_PATH = "ui/assets/splash.png"
-
-favicons_dict = {}
-splash_b64_data_uri = None
+# Favicon/íconos y splash se generan una vez al arrancar y se sirven por URL desde assets_dir.
+from ui.asset_pipeline import build_assets
+_assets_started = time.perf_counter()
+STATIC_ASSETS = build_assets()
+_assets_ms = (time.perf_counter() - _assets_started) * 1000
 
-try:
-    if os.path.exists(ICON_PATH):
-        with open(ICON_PATH, "rb") as image_file:
-            icon_b64 = base64.b64encode(image_file.read()).decode('utf-8')
-            favicons_dict = {
-                "": f"data:image/png;base64,{icon_b64}"
-            }
-            print("✅ Favicon (icon.png) cargado en Base64.")
-    else:
-        print(f"❌ ADVERTENCIA: No se encontró icon.png en {ICON_PATH}")
-except Exception as e:
-    print(f"❌ Error al cargar el favicon: {e}")
-
-try:
-    if os.path.exists(SPLASH_PATH):
-        with open(SPLASH_PATH, "rb") as image_file:
-            splash_b64 = base64.b64encode(image_file.read()).decode('utf-8')
-            splash_b64_data_uri = f"data:image/png;base64,{splash_b64}" 
-            print("✅ Pantalla de carga (splash.png) cargada en Base64.")
-    else:
-        print(f"❌ ADVERTENCIA: No se encontró splash.png en {SPLASH_PATH}")
-except Exception as e:
-    print(f"❌ Error al cargar la pantalla de carga: {e}")
+routes.warm_up()
+_startup_ms = (time.perf_counter() - _startup_started) * 1000
+print(
+    f"⏱️ Arranque en {_startup_ms:.0f} ms · assets {_assets_ms:.0f} ms · vistas precargadas: "
+    + (", ".join(f"{k} {ms:.0f} ms" for k, ms in routes.import_timings().items()) or "ninguna")
+)
 
 
 def main(page: ft.Page):
 
-    if favicons_dict:
-        page.favicons = favicons_dict
-        
-    if splash_b64_data_uri:
-        page.splash = ft.Image(src_base64=splash_b64_data_uri)
+    if STATIC_ASSETS.get("splash"):
+        page.splash = ft.Image(src=STATIC_ASSETS["splash"])
 
     port = int(os.environ.get("PORT", 8501))
     
@@ -128,8 +78,19 @@ def main(page: ft.Page):
 
     api = ApiClient(page)
 
+    # Vistas ya construidas de esta sesión y la que está en pantalla.
+    view_cache = ViewCache()
+    current_view = {"entry": None}
+    # Modo de layout de la sesión (en el servidor, sin ida y vuelta al navegador).
+    layout = {"is_mobile": None}
+    resize_state = {"timer": None, "event": None}
+    resize_lock = threading.Lock()
+
     def logout(e):
         page.session.remove("user_session")
+        view_cache.clear()
+        current_view["entry"] = None
+        api.clear_auth()
         if page.session.contains_key("login_attempt"):
             page.session.remove("login_attempt")
         page.go("/")
@@ -318,31 +279,25 @@ def main(page: ft.Page):
 
     def router(route):
         page.views.clear()
+        current_view["entry"] = None
+        reused = False
         user_session = page.session.get("user_session") or {}
         current_route_key = page.route.strip("/")
         
         current_width = page.width if page.width is not None else 1024
         is_mobile = current_width < MOBILE_BREAKPOINT
-        
-        try:
-            page.client_storage.set("is_mobile", is_mobile)
-        except Exception as e:
-            if "Timeout" in str(e):
-                print(f"WARN: Timeout en client_storage.set. {e}")
-            else:
-                # No relanzar la excepción, solo registrarla
-                print(f"Error en client_storage.set: {e}")
+        layout["is_mobile"] = is_mobile
 
         if not user_session:
             if current_route_key == "register":
-                register_view_instance = register_view.RegisterView(page, api, on_success=on_login_success)
+                register_view_instance = routes.get_view("register")(page, api, on_success=on_login_success)
                 page.views.append(register_view_instance)
             
             elif current_route_key == "captcha-verify":
                 page.views.append(
                     ft.View(
                         "/captcha-verify",
-                        [captcha_view.CaptchaView(page, api, on_login_success)],
+                        [routes.get_view("captcha-verify")(page, api, on_login_success)],
                         horizontal_alignment=ft.CrossAxisAlignment.CENTER,
                         vertical_alignment=ft.MainAxisAlignment.CENTER,
                     )
@@ -354,7 +309,7 @@ def main(page: ft.Page):
                 page.views.append(
                     ft.View(
                         "/",
-                        [login_view.LoginView(page, api, on_success=on_login_success, is_mobile=is_mobile)],
+                        [routes.get_view("login")(page, api, on_success=on_login_success, is_mobile=is_mobile)],
                         horizontal_alignment=ft.CrossAxisAlignment.CENTER,
                         vertical_alignment=ft.MainAxisAlignment.CENTER,
                     )
@@ -372,22 +327,17 @@ def main(page: ft.Page):
                 page.update()
                 return
 
-            view_map = {
-                "dashboard": dashboard_view.DashboardView,
-                "planteles": planteles_view.PlantelesView,
-                "laboratorios": laboratorios_view.LaboratoriosView,
-                "recursos": prestamos_view.PrestamosView,
-                "reservas": reservas_view.ReservasView,
-                "ajustes": settings_view.SettingsView,
-                "horarios": horarios_admin_view.HorariosAdminView,
-            }
-
-            view_function = view_map.get(current_route_key)
+            view_function = routes.get_view(current_route_key)
 
             if view_function:
                 try:
-                    body = view_function(page, api)
-                    page.views.append(build_shell(current_route_key, body, is_mobile))
+                    entry, reused = view_cache.build(
+                        page,
+                        (current_route_key, is_mobile, user_rol),
+                        lambda: view_function(page, api),
+                    )
+                    current_view["entry"] = entry
+                    page.views.append(build_shell(current_route_key, entry.body, is_mobile))
                 except Exception as e:
                     print(f"Error building view for '{current_route_key}': {e}")
                     import traceback
@@ -402,23 +352,44 @@ def main(page: ft.Page):
                 page.views.append(build_shell(current_route_key, body, is_mobile))
 
         page.update()
-
-    def handle_resize(e):
+        if reused:
+            view_cache.refresh_in_background(page, current_view["entry"])
+
+    def apply_resize():
+        with resize_lock:
+            e = resize_state["event"]
+            resize_state["timer"] = None
+            resize_state["event"] = None
+        if e is None:
+            return
         try:
             current_width = page.width if page.width is not None else 1024
             is_now_mobile = current_width < MOBILE_BREAKPOINT
-            
-            was_mobile = page.client_storage.get("is_mobile")
-            
-            if is_now_mobile != was_mobile:
+
+            if is_now_mobile != layout["is_mobile"]:
                 print(f"RESIZE: Cambiando a modo {'MÓVIL' if is_now_mobile else 'ESCRITORIO'} (Ancho: {current_width})")
                 router(page.route)
+                return
+
+            # Las vistas registran su propio page.on_resize al construirse; el
+            # caché lo captura y aquí se le reenvía el evento.
+            entry = current_view["entry"]
+            if entry is not None and entry.on_resize is not None:
+                entry.on_resize(e)
         except Exception as ex:
-            if "Timeout" in str(ex):
-                print(f"WARN: Timeout en client_storage.get. ({ex})")
-            else:
-                print(f"Error en handle_resize: {ex}")
-    
+            print(f"Error en handle_resize: {ex}")
+
+    def handle_resize(e):
+        # Reinicia la espera con cada evento; solo el último de la ráfaga se aplica.
+        with resize_lock:
+            resize_state["event"] = e
+            if resize_state["timer"] is not None:
+                resize_state["timer"].cancel()
+            timer = threading.Timer(RESIZE_DEBOUNCE_SECONDS, apply_resize)
+            timer.daemon = True
+            resize_state["timer"] = timer
+        timer.start()
+
     page.on_resize = handle_resize
 
     page.on_route_change = router
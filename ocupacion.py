@@ -0,0 +1,41 @@
+ESTADOS_ACTIVOS = {"pendiente", "aprobado", "entregado"}
+
+
+def _owner_id(prestamo: dict):
+    usuario = prestamo.get("usuario") or {}
+    owner = usuario.get("id", prestamo.get("usuario_id"))
+    return str(owner) if owner is not None else None
+
+
+class OcupacionRecursos:
+    """
+    Ocupación de recursos derivada de UNA descarga de préstamos.
+
+    - ocupados: recursos con préstamo activo de otros usuarios.
+    - solicitados: recursos con préstamo activo del usuario actual.
+
+    Con `solo_propios=True` el payload viene de /prestamos/mis-solicitudes y
+    todos los préstamos se consideran del usuario actual.
+    """
+
+    def __init__(self, prestamos: list[dict], usuario_id=None, solo_propios: bool = False):
+        self.ocupados: set[int] = set()
+        self.solicitados: set[int] = set()
+        me = str(usuario_id) if usuario_id is not None else None
+        for p in prestamos:
+            if not isinstance(p, dict) or p.get("estado") not in ESTADOS_ACTIVOS:
+                continue
+            rid = (p.get("recurso") or {}).get("id", p.get("recurso_id"))
+            if rid is None:
+                continue
+            if solo_propios or (me is not None and _owner_id(p) == me):
+                self.solicitados.add(rid)
+            else:
+                self.ocupados.add(rid)
+
+    def marcar(self, recurso: dict) -> dict:
+        """Anota `_ocupado` / `_ya_solicitado` en el dict del recurso (usado por los tiles)."""
+        rid = recurso.get("id")
+        recurso["_ocupado"] = rid in self.ocupados
+        recurso["_ya_solicitado"] = rid in self.solicitados
+        return recurso
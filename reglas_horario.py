@@ -0,0 +1,342 @@
+import os
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from agenda import parse_slots
+
+# Duración de cada slot al expandir reglas (la misma que usa el backend).
+INTERVALO_MINUTOS = int(os.environ.get("AGENDA_INTERVALO_MINUTOS", 30))
+
+
+def minutos(value) -> int:
+    """"07:30:00" / "07:30" / time(7, 30) -> 450."""
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    partes = str(value).split(":")
+    return int(partes[0]) * 60 + int(partes[1])
+
+
+class IntervalTree:
+    """
+    Árbol de intervalos estático [inicio, fin) sobre un arreglo ordenado por
+    inicio: cada nodo (el punto medio de su rango) guarda el mayor `fin` de su
+    subárbol, así una consulta descarta ramas enteras y cuesta
+    O(log n + k) para k solapes.
+    """
+
+    def __init__(self, intervalos: list[tuple[int, int, object]]):
+        self._items = sorted(intervalos, key=lambda it: (it[0], it[1]))
+        self._max_fin = [0] * len(self._items)
+        self._build(0, len(self._items))
+
+    def _build(self, lo: int, hi: int) -> int:
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        fin = self._items[mid][1]
+        izq = self._build(lo, mid)
+        der = self._build(mid + 1, hi)
+        self._max_fin[mid] = max(fin, izq, der)
+        return self._max_fin[mid]
+
+    def solapes(self, inicio: int, fin: int) -> list:
+        """Elementos cuyo intervalo se cruza con [inicio, fin) (tocarse en un extremo no cuenta)."""
+        out = []
+        self._query(0, len(self._items), inicio, fin, out)
+        return out
+
+    def _query(self, lo: int, hi: int, inicio: int, fin: int, out: list):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self._max_fin[mid] <= inicio:
+            return  # nada en este subárbol termina después de `inicio`
+        self._query(lo, mid, inicio, fin, out)
+        i_ini, i_fin, item = self._items[mid]
+        if i_ini >= fin:
+            return  # este y todos los de la derecha empiezan después de `fin`
+        if i_fin > inicio:
+            out.append(item)
+        self._query(mid + 1, hi, inicio, fin, out)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ReglasIndex:
+    """
+    Reglas de horario indexadas por (laboratorio_id, dia_semana), con un
+    IntervalTree por clave. laboratorio_id None son las reglas generales.
+
+    - Solape: dos reglas del mismo alcance (mismo laboratorio, o ambas
+      generales) y mismo día cuyos horarios se cruzan. Es un conflicto.
+    - Sobrescritura: una regla de laboratorio que se cruza con una general del
+      mismo día; es válido (la del laboratorio manda), solo se informa.
+    """
+
+    def __init__(self, reglas: list[dict] = ()):
+        self._reglas: dict = {}  # id -> regla
+        self._por_clave: dict = defaultdict(list)
+        self._arboles: dict = {}
+        for regla in reglas:
+            self._insertar(regla)
+        for clave in self._por_clave:
+            self._reconstruir(clave)
+
+    @staticmethod
+    def clave(regla: dict) -> tuple:
+        return regla.get("laboratorio_id"), regla.get("dia_semana")
+
+    def _insertar(self, regla: dict):
+        self._reglas[regla.get("id")] = regla
+        self._por_clave[self.clave(regla)].append(regla)
+
+    def _reconstruir(self, clave: tuple):
+        reglas = self._por_clave.get(clave)
+        if not reglas:
+            self._por_clave.pop(clave, None)
+            self._arboles.pop(clave, None)
+            return
+        intervalos = []
+        for r in reglas:
+            try:
+                intervalos.append((minutos(r.get("hora_inicio")), minutos(r.get("hora_fin")), r))
+            except (TypeError, ValueError, IndexError):
+                print(f"WARN: Regla con horario inválido: {r}")
+        self._arboles[clave] = IntervalTree(intervalos)
+
+    # --- Cambios puntuales (solo se reconstruye el árbol de la clave tocada) ---
+
+    def agregar(self, regla: dict):
+        self._insertar(regla)
+        self._reconstruir(self.clave(regla))
+
+    def quitar(self, regla_id) -> dict | None:
+        regla = self._reglas.pop(regla_id, None)
+        if regla is None:
+            return None
+        clave = self.clave(regla)
+        self._por_clave[clave] = [r for r in self._por_clave[clave] if r.get("id") != regla_id]
+        self._reconstruir(clave)
+        return regla
+
+    def reemplazar(self, regla: dict):
+        self.quitar(regla.get("id"))
+        self.agregar(regla)
+
+    def get(self, regla_id) -> dict | None:
+        return self._reglas.get(regla_id)
+
+    def reglas(self) -> list[dict]:
+        return list(self._reglas.values())
+
+    def del_dia(self, lab_id, dia: int) -> list[dict]:
+        return list(self._por_clave.get((lab_id, dia), ()))
+
+    def __len__(self):
+        return len(self._reglas)
+
+    # --- Consultas ---
+
+    def _consultar(self, lab_id, dia: int, inicio: int, fin: int, excluir_ids=()) -> list[dict]:
+        arbol = self._arboles.get((lab_id, dia))
+        if arbol is None:
+            return []
+        return [r for r in arbol.solapes(inicio, fin) if r.get("id") not in excluir_ids]
+
+    def solapes(self, lab_id, dia: int, hora_inicio, hora_fin, excluir_ids=()) -> list[dict]:
+        """Reglas del mismo alcance y día que se cruzan con el horario dado."""
+        return self._consultar(lab_id, dia, minutos(hora_inicio), minutos(hora_fin), excluir_ids)
+
+    def sobrescritas(self, lab_id, dia: int, hora_inicio, hora_fin) -> list[dict]:
+        """Reglas generales que una regla de `lab_id` taparía en ese horario."""
+        if lab_id is None:
+            return []
+        return self._consultar(None, dia, minutos(hora_inicio), minutos(hora_fin))
+
+    def validar(self, lab_id, dias, hora_inicio, hora_fin, excluir_ids=()) -> dict:
+        """{dia: [reglas en conflicto]} para guardar el horario en esos días; vacío si no hay choques."""
+        excluir_ids = set(excluir_ids)
+        choques = {}
+        for dia in dias:
+            encontrados = self.solapes(lab_id, dia, hora_inicio, hora_fin, excluir_ids)
+            if encontrados:
+                choques[dia] = encontrados
+        return choques
+
+    def conflictos(self, claves=None) -> set:
+        """
+        Ids de las reglas que se solapan con otra de su mismo alcance y día;
+        con `claves` ((laboratorio_id, dia_semana)), solo se barren esas.
+        """
+        ids = set()
+        por_clave = self._por_clave.values() if claves is None else (self._por_clave.get(c, ()) for c in claves)
+        for reglas in por_clave:
+            if len(reglas) < 2:
+                continue
+            ordenadas = []
+            for r in reglas:
+                try:
+                    ordenadas.append((minutos(r.get("hora_inicio")), minutos(r.get("hora_fin")), r.get("id")))
+                except (TypeError, ValueError, IndexError):
+                    continue
+            ordenadas.sort()
+            # Barrido: una regla choca con la anterior de mayor fin si empieza antes de que esta termine.
+            max_fin, max_id = -1, None
+            for inicio, fin, rid in ordenadas:
+                if inicio < max_fin:
+                    ids.add(rid)
+                    ids.add(max_id)
+                if fin > max_fin:
+                    max_fin, max_id = fin, rid
+        return ids
+
+
+def _tipo_slot(regla: dict) -> str:
+    tipo = regla.get("tipo_intervalo") or "no_habilitado"
+    if tipo == "disponible" and regla.get("es_habilitado") is False:
+        return "no_habilitado"
+    return tipo
+
+
+def materializar(indice: ReglasIndex, lab_id: int, days: list[date],
+                 intervalo: int = INTERVALO_MINUTOS) -> dict:
+    """
+    Expande las reglas a slots por día, con la misma forma que devuelve
+    /laboratorios/{id}/horario: {"YYYY-MM-DD": [{"inicio", "fin", "tipo"}]}.
+
+    Las reglas generales del día de la semana se cortan en slots de
+    `intervalo` minutos desde su hora de inicio; las del laboratorio se
+    aplican encima y reemplazan a las generales en los slots que cubren.
+    """
+    out = {}
+    for d in days:
+        por_inicio: dict[int, tuple[int, str]] = {}
+        for alcance in (None, lab_id):
+            tramos = []
+            for regla in indice.del_dia(alcance, d.weekday()):
+                try:
+                    tramos.append((minutos(regla.get("hora_inicio")), minutos(regla.get("hora_fin")), _tipo_slot(regla)))
+                except (TypeError, ValueError, IndexError):
+                    continue
+            if alcance is not None:
+                # Un slot de laboratorio tapa cualquier slot general con el que se cruce.
+                for ini, fin, _ in tramos:
+                    for t in [t for t, (f, _) in por_inicio.items() if t < fin and f > ini]:
+                        del por_inicio[t]
+            for ini, fin, tipo in tramos:
+                for t in range(ini, fin, intervalo):
+                    por_inicio[t] = (min(t + intervalo, fin), tipo)
+        base = datetime.combine(d, time())
+        out[d.isoformat()] = [
+            {
+                "inicio": (base + timedelta(minutes=t)).isoformat(),
+                "fin": (base + timedelta(minutes=f)).isoformat(),
+                "tipo": tipo,
+            }
+            for t, (f, tipo) in sorted(por_inicio.items())
+        ]
+    return out
+
+
+def diferencia_horario(local: dict, backend: dict, days: list[date]) -> str | None:
+    """Primera diferencia entre el horario materializado y el del backend, o None si coinciden."""
+    def normalizar(slots):
+        return [(s.inicio, s.fin, "disponible" if s.disponible else s.tipo) for s in parse_slots(slots)]
+
+    for d in days:
+        mio = normalizar(local.get(d.isoformat(), []))
+        suyo = normalizar(backend.get(d.isoformat(), []))
+        if mio != suyo:
+            for a, b in zip(mio, suyo):
+                if a != b:
+                    return f"{d}: local {a} vs backend {b}"
+            return f"{d}: {len(mio)} slots locales vs {len(suyo)} del backend"
+    return None
+
+
+class GruposReglas:
+    """
+    Reglas agrupadas como las muestra HorariosAdminView: mismo laboratorio,
+    horario, tipo y habilitado (un grupo reúne varios días). Se mantiene entre
+    renders y se actualiza con los cambios de cada guardado/borrado.
+    """
+
+    def __init__(self, reglas: list[dict] = ()):
+        self._grupos: dict = defaultdict(dict)  # clave -> {id: regla}
+        self._clave_de: dict = {}  # id -> clave
+        self._por_alcance: dict = defaultdict(dict)  # (lab o "general", día) -> {id: clave}
+        for regla in reglas:
+            self._poner(regla)
+
+    @staticmethod
+    def clave(regla: dict) -> tuple:
+        lab_id = regla.get("laboratorio_id")
+        return (
+            lab_id if lab_id is not None else "general",
+            regla.get("hora_inicio"),
+            regla.get("hora_fin"),
+            regla.get("tipo_intervalo"),
+            regla.get("es_habilitado"),
+        )
+
+    @staticmethod
+    def alcance(regla: dict) -> tuple:
+        lab_id = regla.get("laboratorio_id")
+        return (lab_id if lab_id is not None else "general", regla.get("dia_semana"))
+
+    def _poner(self, regla: dict) -> tuple:
+        clave = self.clave(regla)
+        self._grupos[clave][regla.get("id")] = regla
+        self._clave_de[regla.get("id")] = clave
+        self._por_alcance[self.alcance(regla)][regla.get("id")] = clave
+        return clave
+
+    def _sacar(self, regla_id) -> tuple | None:
+        clave = self._clave_de.pop(regla_id, None)
+        if clave is not None:
+            regla = self._grupos[clave].pop(regla_id, None)
+            if not self._grupos[clave]:
+                del self._grupos[clave]
+            alcance = self.alcance(regla)
+            self._por_alcance[alcance].pop(regla_id, None)
+            if not self._por_alcance[alcance]:
+                del self._por_alcance[alcance]
+        return clave
+
+    def aplicar(self, guardadas: list[dict] = (), eliminadas: list = ()) -> set:
+        """Aplica reglas creadas/actualizadas y borradas; devuelve las claves de grupo afectadas."""
+        afectadas = set()
+        for regla_id in eliminadas:
+            clave = self._sacar(regla_id)
+            if clave is not None:
+                afectadas.add(clave)
+        for regla in guardadas:
+            clave = self._sacar(regla.get("id"))
+            if clave is not None:
+                afectadas.add(clave)
+            afectadas.add(self._poner(regla))
+        return afectadas
+
+    def grupo(self, clave: tuple) -> list[dict]:
+        """Reglas del grupo ordenadas por día (vacío si el grupo ya no existe)."""
+        return sorted(self._grupos.get(clave, {}).values(), key=lambda r: r.get("dia_semana", -1))
+
+    def clave_de(self, regla_id) -> tuple | None:
+        return self._clave_de.get(regla_id)
+
+    def claves(self) -> list[tuple]:
+        return list(self._grupos)
+
+    def alcances(self) -> list[tuple]:
+        return list(self._por_alcance)
+
+    def claves_en(self, alcances) -> set:
+        """Claves de los grupos con alguna regla en esos (laboratorio o "general", día)."""
+        return {clave for a in alcances for clave in self._por_alcance.get(a, {}).values()}
+
+    def __contains__(self, clave):
+        return clave in self._grupos
+
+    def __len__(self):
+        return len(self._grupos)
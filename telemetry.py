@@ -0,0 +1,139 @@
+import logging
+import os
+import random
+import re
+import sys
+import threading
+
+# Histograma de latencias: límites superiores (ms) de cada cubeta; la última es +inf.
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Fracción de peticiones que dejan una línea de log (los errores siempre la dejan).
+try:
+    LOG_SAMPLE_RATE = float(os.environ.get("API_LOG_SAMPLE_RATE", 0.01))
+except ValueError:
+    LOG_SAMPLE_RATE = 0.01
+
+# Sin API_LOG_LEVEL no se escribe nada en stdout (Railway cobra cada línea).
+logger = logging.getLogger("gestor.api")
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
+if os.environ.get("API_LOG_LEVEL"):
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.environ["API_LOG_LEVEL"].upper())
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """/laboratorios/12/horario?x=1 -> /laboratorios/{id}/horario"""
+    return _ID_SEGMENT.sub("/{id}", endpoint.split("?", 1)[0])
+
+
+class _EndpointStats:
+    __slots__ = ("count", "errors", "status", "buckets", "total_ms", "max_ms", "bytes")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.status: dict[str, int] = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes = 0
+
+    def percentile(self, q: float) -> float:
+        """Aproximado: límite superior de la cubeta que contiene el percentil q."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+
+class Telemetry:
+    """Métricas de peticiones al backend por (método, endpoint normalizado), thread-safe."""
+
+    def __init__(self):
+        self._stats: dict[str, _EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, endpoint: str, status, elapsed: float, nbytes: int = 0):
+        """
+        `status` es el código HTTP o una etiqueta ("timeout", "connection")
+        cuando no hubo respuesta; `elapsed` en segundos.
+        """
+        key = f"{method.upper()} {normalize_endpoint(endpoint)}"
+        ms = elapsed * 1000
+        is_error = not isinstance(status, int) or status >= 400
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EndpointStats()
+            stats.count += 1
+            stats.errors += is_error
+            label = str(status)
+            stats.status[label] = stats.status.get(label, 0) + 1
+            i = 0
+            while i < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[i]:
+                i += 1
+            stats.buckets[i] += 1
+            stats.total_ms += ms
+            stats.max_ms = max(stats.max_ms, ms)
+            stats.bytes += nbytes
+
+        if is_error:
+            logger.warning("request endpoint=%r status=%s ms=%.1f bytes=%d", key, status, ms, nbytes)
+        elif random.random() < LOG_SAMPLE_RATE:
+            logger.info("request endpoint=%r status=%s ms=%.1f bytes=%d", key, status, ms, nbytes)
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            rows = [
+                {
+                    "endpoint": key,
+                    "count": s.count,
+                    "errors": s.errors,
+                    "avg_ms": round(s.total_ms / s.count, 1) if s.count else 0.0,
+                    "p50_ms": s.percentile(0.5),
+                    "p95_ms": s.percentile(0.95),
+                    "max_ms": round(s.max_ms, 1),
+                    "bytes": s.bytes,
+                    "status": dict(s.status),
+                    "buckets": dict(zip([*map(str, LATENCY_BUCKETS_MS), "inf"], s.buckets)),
+                }
+                for key, s in self._stats.items()
+            ]
+        rows.sort(key=lambda r: r["count"], reverse=True)
+        return rows
+
+    def render_text(self) -> str:
+        """Volcado estilo /metrics (formato de exposición de Prometheus)."""
+        lines = []
+        for row in self.snapshot():
+            method, path = row["endpoint"].split(" ", 1)
+            labels = f'method="{method}",endpoint="{path}"'
+            acc = 0
+            for le, n in row["buckets"].items():
+                acc += n
+                bound = "+Inf" if le == "inf" else le
+                lines.append(f'api_request_duration_ms_bucket{{{labels},le="{bound}"}} {acc}')
+            lines.append(f"api_request_duration_ms_count{{{labels}}} {row['count']}")
+            for status, n in row["status"].items():
+                lines.append(f'api_requests_total{{{labels},status="{status}"}} {n}')
+            lines.append(f"api_response_bytes_total{{{labels}}} {row['bytes']}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# Una sola instancia por proceso: las métricas agregan a todas las sesiones.
+telemetry = Telemetry()
@@ -0,0 +1,170 @@
+import os
+import random
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+# --- Pool de conexiones ---
+POOL_CONNECTIONS = _env_int("API_POOL_CONNECTIONS", 20)
+POOL_MAXSIZE = _env_int("API_POOL_MAXSIZE", 50)
+
+# --- Timeouts (connect, read) en segundos ---
+DEFAULT_TIMEOUT = (_env_float("API_CONNECT_TIMEOUT", 5), _env_float("API_READ_TIMEOUT", 15))
+
+# Por prefijo de endpoint; gana el prefijo más largo que coincida.
+ENDPOINT_TIMEOUTS = {
+    "/captcha": (3, 10),
+    "/token": (5, 20),
+    "/auth/": (5, 20),
+    "/admin/prestamos": (5, 30),
+    "/recursos": (5, 30),
+    "/usuarios": (5, 20),
+}
+
+# --- Reintentos ---
+# Solo métodos seguros: repetir un POST/PUT/DELETE que sí llegó al backend
+# podría duplicar reservas o devolver un 404 engañoso.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUS = {502, 503, 504}
+MAX_RETRIES = _env_int("API_MAX_RETRIES", 2)
+BACKOFF_BASE = _env_float("API_BACKOFF_BASE", 0.3)
+BACKOFF_MAX = _env_float("API_BACKOFF_MAX", 4.0)
+# Tope (s) de una petición con sus reintentos: no se reintenta si el intento
+# siguiente empezaría después (una lectura lenta de 15-30 s ya lo agota).
+RETRY_BUDGET = _env_float("API_RETRY_BUDGET", 10)
+
+# --- Circuit breaker ---
+BREAKER_THRESHOLD = _env_int("API_BREAKER_THRESHOLD", 5)
+BREAKER_COOLDOWN = _env_float("API_BREAKER_COOLDOWN", 30)
+
+
+# Política para el jar propio de los transportes compartidos entre usuarios:
+# no guarda nada; las cookies de cada usuario van en el jar de su ApiClient.
+NO_COOKIES_POLICY = DefaultCookiePolicy(allowed_domains=[])
+
+
+def timeout_for(endpoint: str) -> tuple[float, float]:
+    best = None
+    for prefix in ENDPOINT_TIMEOUTS:
+        if endpoint.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return ENDPOINT_TIMEOUTS[best] if best else DEFAULT_TIMEOUT
+
+
+def backoff_delay(attempt: int) -> float:
+    """Backoff exponencial con jitter completo: uniforme en [0, min(max, base·2^n)]."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def retry_delay(attempt: int, retries: int, started: float) -> float | None:
+    """
+    Espera antes de repetir el intento `attempt` de una petición que empezó en
+    `started` (time.monotonic()), o None si no quedan reintentos o tiempo.
+    """
+    if attempt >= retries:
+        return None
+    delay = backoff_delay(attempt)
+    if time.monotonic() - started + delay >= RETRY_BUDGET:
+        return None
+    return delay
+
+
+def build_session() -> requests.Session:
+    session = requests.Session()
+    # Los reintentos los decide ApiClient._make_request (para contarlos en el breaker).
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # La sesión se comparte entre usuarios: su jar no guarda cookies y no
+    # lleva headers con estado. Cada ApiClient pasa su propio jar por petición.
+    session.cookies.set_policy(NO_COOKIES_POLICY)
+    return session
+
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def shared_session() -> requests.Session:
+    """
+    Sesión HTTP única por proceso: todas las sesiones de Flet reutilizan el
+    mismo pool de conexiones keep-alive (y sus handshakes TLS). La
+    autenticación de cada usuario viaja en los headers de cada petición y
+    sus cookies (p. ej. la del captcha) en el `cookies=` de cada petición.
+    """
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = build_session()
+    return _shared_session
+
+
+class CircuitBreaker:
+    """
+    Tras `threshold` fallos de transporte seguidos se abre y rechaza peticiones
+    durante `cooldown` segundos; después deja pasar una de prueba (half-open).
+    Los clientes registran un fallo por petición (no por reintento) y solo
+    cuando el backend no atiende: sin conexión o 502-504, no lecturas lentas.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.cooldown:
+                return False
+            # Una sola petición de prueba a la vez; si nunca reporta, caduca con el cooldown.
+            if self._probe_started is not None and now - self._probe_started < self.cooldown:
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
@@ -0,0 +1,215 @@
+"""
+Pipeline de assets estáticos: genera una sola vez (al arrancar) las variantes
+redimensionadas/comprimidas de las imágenes de ui/assets y las deja en disco
+para que Flet las sirva por URL desde assets_dir, en vez de mandar data URIs
+en base64 a cada cliente.
+
+Las salidas van a ui/assets/generated/ con el hash del archivo fuente en el
+nombre; si ya existen, no se vuelven a generar. Sin Pillow se copian los
+originales (mismas URLs, sin reducir tamaño).
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow es opcional
+    Image = None
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+GENERATED_DIR = "generated"
+
+ICON_SOURCE = "icon.png"
+SPLASH_SOURCE = "splash.png"
+
+# Nombres que el cliente web de Flet busca en assets_dir -> lado en px.
+FAVICON_TARGETS = {
+    "favicon.png": 64,
+    "icons/Icon-192.png": 192,
+    "icons/Icon-512.png": 512,
+    "icons/Icon-maskable-192.png": 192,
+    "icons/Icon-maskable-512.png": 512,
+    "icons/apple-touch-icon-192.png": 192,
+}
+SPLASH_MAX_SIDE = 1280
+SPLASH_QUALITY = 80
+
+# Imágenes de las vistas: primera fuente existente y lado máximo por layout.
+# El logo se muestra a 56 px (se genera al doble para pantallas HiDPI).
+IMAGE_ASSETS = {
+    "logo": {"sources": ["a.png"], "fmt": "PNG", "desktop": 112, "mobile": 112},
+    "login_background": {
+        "sources": ["background.png", "dark_abstract_background.png"],
+        "fmt": "WEBP", "quality": 72, "desktop": 1920, "mobile": 900,
+    },
+}
+
+_hash_cache: dict = {}
+_image_urls: dict = {}
+_image_lock = threading.Lock()
+
+
+def source_hash(path: str) -> str:
+    """sha256 (12 hex) del archivo; memoizado por (ruta, mtime, tamaño)."""
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    if key not in _hash_cache:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _hash_cache[key] = h.hexdigest()[:12]
+    return _hash_cache[key]
+
+
+def _tmp_path(target: str) -> str:
+    """Archivo temporal único junto a `target`: cada worker escribe el suyo y lo publica con os.replace."""
+    fd, path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=f".{os.path.basename(target)}.", suffix=".tmp")
+    os.close(fd)
+    return path
+
+
+def _remove_stale(out_dir: str, prefix: str, keep: str):
+    for name in os.listdir(out_dir):
+        if name.startswith(prefix) and name != keep:
+            try:
+                os.remove(os.path.join(out_dir, name))
+            except OSError:
+                pass
+
+
+def variant(source: str, name: str, max_side: int = None, fmt: str = "PNG", quality: int = 85,
+            assets_dir: str = ASSETS_DIR) -> str | None:
+    """
+    Genera (o reutiliza) ui/assets/generated/<name>-<hash>.<ext> a partir de
+    `source`, reducido a `max_side` px en su lado mayor. Devuelve la ruta
+    relativa a assets_dir, o None si la fuente no existe.
+    """
+    src_path = os.path.join(assets_dir, source)
+    if not os.path.exists(src_path):
+        return None
+    out_dir = os.path.join(assets_dir, GENERATED_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+
+    digest = source_hash(src_path)
+    if Image is None:
+        # Marca distinta para que, al instalar Pillow, se regeneren reducidas.
+        ext = "orig." + os.path.splitext(source)[1].lstrip(".").lower()
+    else:
+        ext = {"JPEG": "jpg"}.get(fmt, fmt.lower())
+    filename = f"{name}-{digest}.{ext}"
+    out_path = os.path.join(out_dir, filename)
+    rel_path = f"{GENERATED_DIR}/{filename}"
+    if os.path.exists(out_path):
+        return rel_path
+
+    # Escritura atómica con temporal propio: varios workers pueden arrancar a la vez.
+    tmp_path = _tmp_path(out_path)
+    try:
+        if Image is None:
+            shutil.copyfile(src_path, tmp_path)
+        else:
+            with Image.open(src_path) as img:
+                if max_side and max(img.size) > max_side:
+                    img.thumbnail((max_side, max_side), Image.LANCZOS)
+                if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+                if fmt == "PNG":
+                    img.save(tmp_path, fmt, optimize=True)
+                elif fmt == "WEBP":
+                    img.save(tmp_path, fmt, quality=quality, method=6)
+                else:
+                    img.save(tmp_path, fmt, quality=quality, optimize=True)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _remove_stale(out_dir, f"{name}-", filename)
+    return rel_path
+
+
+def _publish(rel_path: str, target: str, assets_dir: str):
+    """Copia una variante a la ruta fija que espera el cliente (favicon.png, icons/...)."""
+    src = os.path.join(assets_dir, rel_path)
+    dst = os.path.join(assets_dir, target)
+    if os.path.exists(dst) and os.path.getsize(dst) == os.path.getsize(src) and os.path.getmtime(dst) >= os.path.getmtime(src):
+        return
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = _tmp_path(dst)
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def image_url(key: str, is_mobile: bool = False) -> str | None:
+    """
+    URL (servida desde assets_dir) de la variante de IMAGE_ASSETS[key] para el
+    layout. Se resuelve una vez por proceso; None si no hay fuente local.
+    """
+    memo_key = (key, is_mobile)
+    if memo_key in _image_urls:
+        return _image_urls[memo_key]
+    with _image_lock:
+        if memo_key not in _image_urls:
+            spec = IMAGE_ASSETS[key]
+            layout = "mobile" if is_mobile else "desktop"
+            url = None
+            for source in spec["sources"]:
+                try:
+                    rel = variant(source, f"{key}-{layout}", max_side=spec[layout], fmt=spec["fmt"],
+                                  quality=spec.get("quality", 85))
+                except Exception as e:
+                    print(f"❌ Error generando {key} desde {source}: {e}")
+                    rel = None
+                if rel:
+                    url = f"/{rel}"
+                    break
+            _image_urls[memo_key] = url
+    return _image_urls[memo_key]
+
+
+def build_assets(assets_dir: str = ASSETS_DIR) -> dict:
+    """
+    Prepara favicon/íconos y splash. Devuelve {"favicon": url|None, "splash": url|None}
+    con URLs relativas a assets_dir (p. ej. "/generated/splash-<hash>.webp").
+    """
+    started = time.perf_counter()
+    result = {"favicon": None, "splash": None}
+    try:
+        for target, side in FAVICON_TARGETS.items():
+            rel = variant(ICON_SOURCE, f"icon-{side}", max_side=side, fmt="PNG", assets_dir=assets_dir)
+            if rel is None:
+                print(f"❌ ADVERTENCIA: No se encontró {ICON_SOURCE} en {assets_dir}")
+                break
+            _publish(rel, target, assets_dir)
+            if target == "favicon.png":
+                result["favicon"] = f"/{target}"
+
+        rel = variant(SPLASH_SOURCE, "splash", max_side=SPLASH_MAX_SIDE, fmt="WEBP", quality=SPLASH_QUALITY,
+                      assets_dir=assets_dir)
+        if rel is None:
+            print(f"❌ ADVERTENCIA: No se encontró {SPLASH_SOURCE} en {assets_dir}")
+        else:
+            result["splash"] = f"/{rel}"
+    except Exception as e:
+        print(f"❌ Error preparando assets estáticos: {e}")
+
+    # Las imágenes de las vistas se preparan aquí para que la primera visita no espere.
+    if assets_dir == ASSETS_DIR:
+        for key in IMAGE_ASSETS:
+            image_url(key, is_mobile=False)
+            image_url(key, is_mobile=True)
+
+    modo = "Pillow" if Image is not None else "sin Pillow, originales"
+    print(f"✅ Assets estáticos listos en {(time.perf_counter() - started) * 1000:.0f} ms ({modo}).")
+    return result
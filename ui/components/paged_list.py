@@ -0,0 +1,196 @@
+import threading
+from collections import deque
+from typing import Any, Callable, Optional, Sequence
+
+import flet as ft
+
+from ui.components.buttons import Ghost
+
+# Distancia (px) al final (o al inicio) de la lista a partir de la cual se pide la página siguiente (o la anterior).
+LOAD_MORE_THRESHOLD = 400
+
+
+class PagedList(ft.ListView):
+    """
+    ListView que pide sus elementos por páginas y construye los controles
+    solo a medida que el usuario se acerca al final con el scroll.
+
+    `fetch_page(offset, limit)` devuelve una lista (o un dict con "error");
+    `build_item(item)` devuelve el control del elemento o None para omitirlo.
+    Una página más corta que `page_size` marca el final de los datos.
+    Si la lista completa ya se descargó, `reset(items=...)` pagina sobre esa
+    copia: todas las páginas salen de la misma foto aunque la caché expire.
+
+    Con `item_extent` (alto fijo de cada fila, que la vista garantiza) y
+    `max_pages`, solo quedan construidas esas páginas: al bajar se descarta
+    la de arriba y al volver a subir se reconstruye y se descarta la de
+    abajo. El scroll se corrige en filas × `item_extent`, así que la cantidad
+    de controles no crece con el recorrido. Para que cada fila mida
+    exactamente eso, el espacio entre filas va dentro de la fila (sin
+    `spacing`). Sin esos dos parámetros (filas de alto variable) las páginas
+    alcanzadas se acumulan.
+    """
+
+    def __init__(self,
+                 fetch_page: Callable[[int, int], Any],
+                 build_item: Callable[[Any], Optional[ft.Control]],
+                 page_size: int = 30,
+                 empty_text: str = "Sin resultados.",
+                 max_pages: Optional[int] = None,
+                 **kwargs):
+        super().__init__(on_scroll=self._on_scroll, on_scroll_interval=100, **kwargs)
+        self.fetch_page = fetch_page
+        self.build_item = build_item
+        self.page_size = page_size
+        self.empty_text = empty_text
+        self.max_pages = max_pages
+        self._start = 0  # offset del primer elemento construido
+        self._offset = 0  # offset siguiente al último construido
+        self._pages = deque()  # (elementos, controles) de cada página construida, en orden
+        self._items = None  # foto de la lista completa, o None para usar fetch_page
+        self._exhausted = False
+        self._loading = False
+        self._gen = 0
+        self._lock = threading.Lock()
+        # Respaldo por si la primera página no llena la pantalla (sin scroll no hay evento).
+        self._more_btn = Ghost("Cargar más", on_click=lambda e: self.load_more())
+        self._footer = ft.Container(self._more_btn, alignment=ft.alignment.center, visible=False)
+        self._prev_btn = Ghost("Ver anteriores", on_click=lambda e: self.load_previous())
+        self._header = ft.Container(self._prev_btn, alignment=ft.alignment.center, visible=False)
+        self.controls = [self._header, self._footer]
+
+    @property
+    def exhausted(self) -> bool:
+        return self._exhausted
+
+    @property
+    def _windowed(self) -> bool:
+        return bool(self.max_pages and self.item_extent)
+
+    def reset(self, first_page: Optional[Sequence] = None, items: Optional[Sequence] = None):
+        """
+        Vacía la lista y carga la primera página (o usa `first_page` si ya se
+        pidió). Con `items`, las páginas se recortan de esa lista en vez de pedirse.
+        """
+        with self._lock:
+            self._gen += 1
+            self._start = self._offset = 0
+            self._pages.clear()
+            self._items = list(items) if items is not None else None
+            self._exhausted = False
+            self._loading = False
+            self._header.visible = self._footer.visible = False
+            self.controls = [self._header, self._footer]
+        if self._items is not None:
+            first_page = self._items[:self.page_size]
+        if first_page is None:
+            self.load_more()
+        else:
+            self._append(self._gen, first_page)
+
+    def load_more(self):
+        with self._lock:
+            if self._loading or self._exhausted:
+                return
+            self._loading = True
+            gen, offset = self._gen, self._offset
+        self._append(gen, self._fetch(offset, self.page_size))
+
+    def load_previous(self):
+        """Reconstruye la página anterior a la primera construida (solo con ventana de páginas)."""
+        with self._lock:
+            if self._loading or self._start == 0:
+                return
+            self._loading = True
+            gen = self._gen
+            limit = min(self.page_size, self._start)
+            offset = self._start - limit
+        self._prepend(gen, offset, self._fetch(offset, limit))
+
+    def _fetch(self, offset: int, limit: int):
+        snapshot = self._items
+        if snapshot is not None:
+            return snapshot[offset:offset + limit]
+        try:
+            return self.fetch_page(offset, limit)
+        except Exception as ex:
+            print(f"Error cargando página {offset}: {ex}")
+            return {"error": str(ex)}
+
+    def _build(self, items: list) -> list:
+        return [c for c in map(self.build_item, items) if c is not None]
+
+    def _append(self, gen: int, items):
+        delta = 0
+        with self._lock:
+            if gen != self._gen:
+                return  # la lista se reinició mientras llegaba esta página
+            self._loading = False
+            if not isinstance(items, list):
+                detail = items.get("error", "Error desconocido") if isinstance(items, dict) else "Error desconocido"
+                controls = [ft.Text(f"Error al cargar: {detail}", color=ft.Colors.ERROR, max_lines=3, overflow=ft.TextOverflow.ELLIPSIS)]
+                count = 0
+                self._exhausted = True
+            else:
+                controls = self._build(items)
+                count = len(items)
+                self._offset += count
+                self._exhausted = count < self.page_size
+                if not controls and len(self.controls) == 2:
+                    controls = [ft.Container(
+                        ft.Text(self.empty_text, text_align=ft.TextAlign.CENTER),
+                        padding=20,
+                        alignment=ft.alignment.center,
+                    )]
+            self.controls[-1:-1] = controls
+            self._pages.append((count, len(controls)))
+            if self._windowed and len(self._pages) > self.max_pages:
+                count, n = self._pages.popleft()
+                del self.controls[1:1 + n]
+                self._start += count
+                delta -= n * self.item_extent
+                if not self._header.visible:
+                    self._header.visible = True
+                    delta += self.item_extent
+            self._footer.visible = not self._exhausted
+        self._refresh(delta)
+
+    def _prepend(self, gen: int, offset: int, items):
+        delta = 0
+        with self._lock:
+            if gen != self._gen:
+                return
+            self._loading = False
+            if not isinstance(items, list) or not items:
+                # Queda el botón "Ver anteriores" para reintentar.
+                print(f"Error cargando página {offset}: {items}")
+                return
+            controls = self._build(items)
+            self.controls[1:1] = controls
+            self._pages.appendleft((len(items), len(controls)))
+            self._start = offset
+            delta += len(controls) * self.item_extent
+            if self._start == 0 and self._header.visible:
+                self._header.visible = False
+                delta -= self.item_extent
+            if len(self._pages) > self.max_pages:
+                count, n = self._pages.pop()
+                if n:
+                    del self.controls[-1 - n:-1]
+                self._offset -= count
+                self._exhausted = False
+            self._footer.visible = not self._exhausted
+        self._refresh(delta)
+
+    def _refresh(self, delta: float):
+        if self.page:
+            self.update()
+            # Las filas agregadas o quitadas arriba del viewport no deben mover lo que el usuario ve.
+            if delta:
+                self.scroll_to(delta=delta, duration=0)
+
+    def _on_scroll(self, e: ft.OnScrollEvent):
+        if e.max_scroll_extent is not None and e.pixels >= e.max_scroll_extent - LOAD_MORE_THRESHOLD:
+            self.load_more()
+        elif self._start > 0 and e.pixels is not None and e.pixels <= LOAD_MORE_THRESHOLD:
+            self.load_previous()
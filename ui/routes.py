@@ -0,0 +1,81 @@
+"""
+Registro de rutas con carga diferida: cada módulo de vista se importa la
+primera vez que alguien navega a su ruta (un estudiante nunca carga las
+vistas de administración). WARMUP_VIEWS permite precargar algunas al arrancar.
+"""
+
+import importlib
+import os
+import threading
+import time
+import traceback
+
+import flet as ft
+
+# ruta -> (módulo, función que construye la vista)
+VIEW_ROUTES = {
+    "login": ("ui.views.login_view", "LoginView"),
+    "register": ("ui.views.register_view", "RegisterView"),
+    "captcha-verify": ("ui.views.captcha_view", "CaptchaView"),
+    "dashboard": ("ui.views.dashboard_view", "DashboardView"),
+    "planteles": ("ui.views.planteles_view", "PlantelesView"),
+    "laboratorios": ("ui.views.laboratorios_view", "LaboratoriosView"),
+    "recursos": ("ui.views.prestamos_view", "PrestamosView"),
+    "reservas": ("ui.views.reservas_view", "ReservasView"),
+    "ajustes": ("ui.views.settings_view", "SettingsView"),
+    "horarios": ("ui.views.horarios_admin_view", "HorariosAdminView"),
+}
+
+# Lista separada por comas; "*" precarga todas, vacío ninguna.
+WARMUP_VIEWS = os.environ.get("WARMUP_VIEWS", "login,dashboard")
+
+_loaded: dict = {}
+_timings: dict = {}  # ruta -> ms que tardó la importación
+_lock = threading.Lock()
+
+
+class EmergencyView(ft.Column):
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.controls = [ft.Text("Sistema de Gestión de Laboratorios", size=20)]
+        self.expand = True
+        self.alignment = ft.MainAxisAlignment.CENTER
+        self.horizontal_alignment = ft.CrossAxisAlignment.CENTER
+
+
+def get_view(route_key: str):
+    """Función constructora de la vista de `route_key` (importándola si hace falta), o None."""
+    view = _loaded.get(route_key)
+    if view is not None:
+        return view
+    if route_key not in VIEW_ROUTES:
+        return None
+    with _lock:
+        if route_key not in _loaded:
+            module_name, attr = VIEW_ROUTES[route_key]
+            started = time.perf_counter()
+            try:
+                _loaded[route_key] = getattr(importlib.import_module(module_name), attr)
+            except ImportError as e:
+                print(f"❌ Error importando vista '{route_key}' ({module_name}): {e}")
+                traceback.print_exc()
+                _loaded[route_key] = EmergencyView
+            _timings[route_key] = (time.perf_counter() - started) * 1000
+    return _loaded[route_key]
+
+
+def warm_up(spec: str = None) -> list[str]:
+    spec = WARMUP_VIEWS if spec is None else spec
+    keys = list(VIEW_ROUTES) if spec.strip() == "*" else [k.strip() for k in spec.split(",") if k.strip()]
+    warmed = []
+    for key in keys:
+        if key in VIEW_ROUTES:
+            get_view(key)
+            warmed.append(key)
+        else:
+            print(f"WARN: WARMUP_VIEWS contiene una ruta desconocida: '{key}'")
+    return warmed
+
+
+def import_timings() -> dict:
+    return dict(_timings)
@@ -0,0 +1,89 @@
+"""
+Caché de vistas por sesión: el router reutiliza el control ya construido de
+una ruta en vez de reconstruirlo (y repetir todas sus llamadas a la API).
+
+Clave: (ruta, is_mobile, rol). LRU acotado por VIEW_CACHE_SIZE. Una vista
+puede exponer un callable `refresh` en su control raíz (ver `with_refresh`);
+al volver a ella se ejecuta en segundo plano para traer datos frescos.
+"""
+
+import os
+import time
+from collections import OrderedDict
+
+import flet as ft
+
+VIEW_CACHE_SIZE = int(os.environ.get("VIEW_CACHE_SIZE", 6))
+# No refrescar una vista si se construyó/refrescó hace menos de esto.
+VIEW_REFRESH_MIN_SECONDS = float(os.environ.get("VIEW_REFRESH_MIN_SECONDS", 15))
+
+
+def with_refresh(control: ft.Control, refresh) -> ft.Control:
+    """Marca `control` como refrescable: `refresh()` vuelve a cargar sus datos."""
+    control.refresh = refresh
+    return control
+
+
+class CachedView:
+    __slots__ = ("body", "on_resize", "refresh", "refreshed_at")
+
+    def __init__(self, body: ft.Control, on_resize=None, refresh=None):
+        self.body = body
+        self.on_resize = on_resize  # handler que la vista dejó en page.on_resize al construirse
+        self.refresh = refresh
+        self.refreshed_at = time.monotonic()
+
+
+class ViewCache:
+    def __init__(self, maxsize: int = VIEW_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key) -> CachedView | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry: CachedView):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def build(self, page: ft.Page, key, builder) -> tuple[CachedView, bool]:
+        """
+        Devuelve (entrada, reutilizada). Si no está en caché llama a
+        `builder()` capturando el page.on_resize que la vista registre, para
+        que el router lo reenvíe en vez de perder el suyo.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry, True
+
+        previous = page.on_resize
+        page.on_resize = None
+        try:
+            body = builder()
+            entry = CachedView(body, page.on_resize, getattr(body, "refresh", None))
+        finally:
+            page.on_resize = previous
+        self.put(key, entry)
+        return entry, False
+
+    def refresh_in_background(self, page: ft.Page, entry: CachedView):
+        """Ejecuta el `refresh` de una vista reutilizada (llamar después de mostrarla)."""
+        if entry.refresh is None or time.monotonic() - entry.refreshed_at < VIEW_REFRESH_MIN_SECONDS:
+            return
+        entry.refreshed_at = time.monotonic()
+
+        def run():
+            try:
+                entry.refresh()
+            except Exception as e:
+                print(f"WARN: Error refrescando vista en caché: {e}")
+
+        page.run_thread(run)
@@ -1,11 +1,29 @@
 # views/__init__.py
-from . import login_view
-from . import register_view
-from . import dashboard_view
-from . import planteles_view
-from . import laboratorios_view
-from . import reservas_view
-from . import prestamos_view
-from . import settings_view
-from . import captcha_view
-from . import horarios_admin_view
\ No newline at end of file
+# Los módulos de vistas se cargan bajo demanda (PEP 562): importar el paquete
+# no importa ninguna vista; `ui.views.reservas_view` la importa al primer acceso.
+import importlib
+
+__all__ = [
+    "login_view",
+    "register_view",
+    "dashboard_view",
+    "planteles_view",
+    "laboratorios_view",
+    "reservas_view",
+    "prestamos_view",
+    "settings_view",
+    "captcha_view",
+    "horarios_admin_view",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,10 +1,12 @@
 from __future__ import annotations
 import flet as ft
 from api_client import ApiClient
+from catalogo import Catalogo
 from datetime import datetime
 import traceback
 
 from ui.components.cards import Card
+from ui.view_cache import with_refresh
 
 
 def DashboardView(page: ft.Page, api: ApiClient):
@@ -92,39 +94,23 @@ def DashboardView(page: ft.Page, api: ApiClient):
     mis_prestamos_list = ft.Column(spacing=10)
     mis_reservas_list = ft.Column(spacing=10)
 
-    planteles_cache: list[dict] = []
-    labs_cache: list[dict] = []
-    plantel_by_id: dict[int, dict] = {}
-    lab_by_id: dict[int, dict] = {}
+    catalogo = Catalogo([], [])
 
     def cargar_catálogos():
-        nonlocal planteles_cache, labs_cache, plantel_by_id, lab_by_id
+        nonlocal catalogo
         try:
-            planteles = api.get_planteles()
-            labs = api.get_laboratorios()
-            if isinstance(planteles, list):
-                planteles_cache = planteles
-                plantel_by_id = {p["id"]: p for p in planteles if isinstance(p, dict) and p.get("id") is not None}
+            data = api.get_catalogo()
+            if isinstance(data, Catalogo):
+                catalogo = data
             else:
-                print("WARN: planteles response not list:", type(planteles))
-            if isinstance(labs, list):
-                labs_cache = labs
-                lab_by_id = {l["id"]: l for l in labs if isinstance(l, dict) and l.get("id") is not None}
-            else:
-                print("WARN: labs response not list:", type(labs))
+                print("WARN: catálogo no disponible:", data)
         except Exception as e:
             print(f"ERROR: cargar_catálogos(): {e}")
             traceback.print_exc()
 
     def ubicacion_from_recurso_or_lab(lab_id: int | None) -> tuple[str, str]:
         """Devuelve (plantel_nombre, lab_nombre) a partir de laboratorio_id."""
-        if lab_id is None:
-            return ("-", "-")
-        lab = lab_by_id.get(lab_id) or {}
-        lab_nombre = lab.get("nombre", f"Lab #{lab_id}")
-        plantel_id = lab.get("plantel_id")
-        plantel_nombre = plantel_by_id.get(plantel_id, {}).get("nombre", f"Plantel #{plantel_id}" if plantel_id else "-")
-        return (plantel_nombre, lab_nombre)
+        return catalogo.ubicacion(lab_id)
 
     # -------------------- Render: Préstamos --------------------
     def render_mis_prestamos():
@@ -358,4 +344,8 @@ def DashboardView(page: ft.Page, api: ApiClient):
     page.on_resize = on_page_resize
     on_page_resize(None)
 
-    return root_container
+    def refresh():
+        render_mis_prestamos()
+        render_mis_reservas()
+
+    return with_refresh(root_container, refresh)
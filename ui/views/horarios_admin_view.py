@@ -1,12 +1,13 @@
 import flet as ft
 from api_client import ApiClient
+from reglas_horario import INTERVALO_MINUTOS, GruposReglas, ReglasIndex
 from ui.components.cards import Card
+from ui.view_cache import with_refresh
 from ui.components.inputs import TextField, Dropdown, generate_time_options
 from ui.components.buttons import Primary, Danger, Icon, Ghost
 from datetime import time, date, datetime, timedelta
 import traceback
 from typing import Dict, List, Tuple, Optional
-from collections import defaultdict
 import json
 
 # --- Constantes ---
@@ -17,7 +18,6 @@ DIAS_SEMANA_SHORT: Dict[int, str] = {k: v[:3] for k, v in DIAS_SEMANA.items()}
 
 HORA_INICIO_DIA = time(0, 0)
 HORA_FIN_DIA = time(23, 59)
-INTERVALO_MINUTOS = 30
 HORA_OPTIONS = generate_time_options(HORA_INICIO_DIA, HORA_FIN_DIA, INTERVALO_MINUTOS)
 
 TIPO_OPTIONS = [
@@ -159,11 +159,18 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
     state = {
         "editing_group_rules": None,
         "editing_single_rule_id": None,
+        "indice": ReglasIndex(),  # reglas cargadas, para validar el formulario sin ir al backend
+        "conflictivas": set(),
+        # Agrupación persistente: cada guardado/borrado aplica sus cambios y
+        # solo se reconstruyen las tarjetas de los grupos afectados.
+        "grupos": GruposReglas(),
+        "cards": {},  # clave de grupo -> tarjeta
+        "firmas": {},  # clave de grupo -> avisos con los que se pintó
+        "cargadas": False,
     }
 
     # --- Catálogos y Datos ---
-    planteles_data = api.get_planteles()
-    labs_data = api.get_laboratorios()
+    planteles_data, labs_data = api.gather(api.get_planteles, api.get_laboratorios)
     if not isinstance(planteles_data, list): planteles_data = []
     if not isinstance(labs_data, list): labs_data = []
     labs_cache = labs_data
@@ -229,6 +236,14 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
 
     info_txt = ft.Text("")
     reglas_list_panel = ft.Column(spacing=10, scroll=ft.ScrollMode.ADAPTIVE, expand=True)
+    # Filtra las reglas ya cargadas; no vuelve a pedirlas.
+    dd_filtro_lab = Dropdown(
+        label="Filtrar por laboratorio",
+        options=[("todos", "Todos")] + lab_options,
+        value="todos",
+        col={"xs": 12, "sm": 6, "md": 4},
+        on_change=lambda e: pintar_lista(),
+    )
 
     # --- 2. Declarar variables ---
     btn_save = None
@@ -308,6 +323,21 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
         btn_cancel.update()
         info_txt.update()
 
+    def resumen_reporte(reporte: dict) -> str:
+        """Texto del reporte de batch_reglas_horario: éxitos y, si hubo, qué días fallaron."""
+        ok = reporte["ok"]
+        partes = []
+        if ok["crear"] or ok["actualizar"]: partes.append(f"{ok['crear'] + ok['actualizar']} éxito(s).")
+        if ok["eliminar"]: partes.append(f"{ok['eliminar']} eliminada(s).")
+        fallos = reporte["fallos"]
+        if fallos:
+            detalle = "; ".join(
+                f"{DIAS_SEMANA_SHORT.get(f['dia_semana']) or 'ID ' + str(f['id'])} ({f['accion']}): {f['detail']}"
+                for f in fallos
+            )
+            partes.append(f"{len(fallos)} error(es): {detalle}")
+        return " ".join(partes)
+
     # --- NEW: Delete Group Function ---
     def delete_group_click(group_rules: List[dict]):
         nonlocal info_txt
@@ -319,37 +349,64 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
             info_txt.update()
             return
 
-        success_count = 0
-        error_count = 0
-        last_error = ""
-
-        for rule_id in rule_ids_to_delete:
-            result = api.delete_regla_horario(rule_id)
-            if result is True:
-                success_count += 1
-            else:
-                error_count += 1
-                last_error = result.get("detail", "Error desconocido") if isinstance(result, dict) else "Error desconocido"
-
-        if error_count == 0:
-            info_txt.value = f"Grupo ({success_count} reglas) eliminado con éxito."
-            render_reglas()
+        reporte = api.batch_reglas_horario([
+            ("eliminar", rule.get("id"), {"dia_semana": rule.get("dia_semana")})
+            for rule in group_rules if rule.get("id")
+        ])
+        if reporte["fallos"]:
+            info_txt.value = f"Error al eliminar grupo. {resumen_reporte(reporte)}"
         else:
-            info_txt.value = f"Error al eliminar grupo. {success_count} éxito(s), {error_count} error(es). Último error: {last_error}"
-            render_reglas()
+            info_txt.value = f"Grupo ({reporte['ok']['eliminar']} reglas) eliminado con éxito."
+        tras_reporte(reporte)
         info_txt.update()
 
     # --- MODIFIED: Delete Single Rule Function ---
     def delete_regla_click(regla_id: int):
         nonlocal info_txt
         result = api.delete_regla_horario(regla_id)
-        if result is True:
+        if isinstance(result, dict) and "error" not in result:
             info_txt.value = "Regla eliminada."
-            render_reglas()
+            aplicar_cambios([], [regla_id])
         else:
-            info_txt.value = result.get("detail", "Error al eliminar.") if isinstance(result, dict) else "Error desconocido al eliminar."
+            info_txt.value = result.get("error", "Error al eliminar.") if isinstance(result, dict) else "Error desconocido al eliminar."
         info_txt.update()
 
+    def avisos(reglas: List[dict]) -> Tuple[bool, bool]:
+        """(se solapa con otra regla de su alcance, sobrescribe una regla general)."""
+        conflictivas = state["conflictivas"]
+        indice = state["indice"]
+        conflicto = any(r.get("id") in conflictivas for r in reglas)
+        sobrescribe = any(
+            r.get("laboratorio_id") is not None
+            and indice.sobrescritas(r.get("laboratorio_id"), r.get("dia_semana"), r.get("hora_inicio"), r.get("hora_fin"))
+            for r in reglas
+        )
+        return conflicto, sobrescribe
+
+    def aviso_chips(reglas: List[dict]) -> List[ft.Control]:
+        """Chips de conflicto (solape en el mismo alcance) y de sobrescritura de la regla general."""
+        chips = []
+        conflicto, sobrescribe = avisos(reglas)
+        if conflicto:
+            chips.append(ft.Chip(
+                label=ft.Text("Se solapa con otra regla", size=11, color=ft.Colors.ERROR),
+                leading=ft.Icon(ft.Icons.WARNING_AMBER, color=ft.Colors.ERROR, size=16),
+                bgcolor=ft.Colors.with_opacity(0.1, ft.Colors.ERROR),
+                height=28
+            ))
+        if sobrescribe:
+            chips.append(ft.Chip(
+                label=ft.Text("Sobrescribe la regla general", size=11),
+                leading=ft.Icon(ft.Icons.LAYERS_OUTLINED, size=16),
+                height=28
+            ))
+        return chips
+
+    def marcar_conflicto(card: ft.Container, reglas: List[dict]) -> ft.Container:
+        if any(r.get("id") in state["conflictivas"] for r in reglas):
+            card.border = ft.border.all(1.5, ft.Colors.ERROR)
+        return card
+
     # --- MODIFIED: Group Card para móvil ---
     def group_card(group_rules: List[dict]) -> ft.Control:
         nonlocal lab_map
@@ -401,7 +458,7 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
             ft.Column([
                 title,
                 subtitle,
-                ft.Row([status_chip], wrap=True)
+                ft.Row([status_chip, *aviso_chips(group_rules)], wrap=True)
             ], col={"xs": 12, "sm": 8, "md": 6}),
             ft.Column([
                 btns
@@ -409,7 +466,7 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
                horizontal_alignment=ft.CrossAxisAlignment.END)
         ], vertical_alignment=ft.CrossAxisAlignment.CENTER)
 
-        return Card(header, padding=14)
+        return marcar_conflicto(Card(header, padding=14), group_rules)
 
     # --- MODIFIED: Single Rule Card para móvil ---
     def regla_card(regla: dict) -> ft.Control:
@@ -457,7 +514,7 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
             ft.Column([
                 title,
                 subtitle,
-                ft.Row([status_chip], wrap=True)
+                ft.Row([status_chip, *aviso_chips([regla])], wrap=True)
             ], col={"xs": 12, "sm": 8, "md": 6}),
             ft.Column([
                 btns
@@ -465,51 +522,103 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
                horizontal_alignment=ft.CrossAxisAlignment.END)
         ], vertical_alignment=ft.CrossAxisAlignment.CENTER)
 
-        return Card(header, padding=14)
+        return marcar_conflicto(Card(header, padding=14), [regla])
 
-    # --- MODIFIED: Render Function with Grouping ---
-    def render_reglas():
-        nonlocal reglas_list_panel
+    # --- Render con índice de grupos persistente ---
+    def orden_grupo(clave: tuple):
+        """General primero y luego por título, igual que el texto de la tarjeta."""
+        reglas = state["grupos"].grupo(clave)
+        lab_name = lab_map.get(str(clave[0]), str(clave[0]))
+        if len(reglas) > 1:
+            dias = ", ".join(DIAS_SEMANA_SHORT.get(r.get("dia_semana"), '?') for r in reglas if r.get("dia_semana") is not None)
+        else:
+            dias = DIAS_SEMANA.get(reglas[0].get("dia_semana"), 'N/A')
+        return (clave[0] != "general", f"{lab_name} - {dias}")
+
+    def firma_grupo(clave: tuple) -> tuple:
+        return avisos(state["grupos"].grupo(clave))
+
+    def card_grupo(clave: tuple) -> ft.Control:
+        reglas = state["grupos"].grupo(clave)
+        return group_card(reglas) if len(reglas) > 1 else regla_card(reglas[0])
+
+    def grupo_visible(clave: tuple) -> bool:
+        filtro = dd_filtro_lab.value or "todos"
+        return filtro == "todos" or str(clave[0]) == filtro
+
+    def pintar_lista():
+        """Arma el panel con las tarjetas ya construidas (filtro y orden), sin pedir nada al backend."""
         reglas_list_panel.controls.clear()
+        claves = sorted((c for c in state["cards"] if grupo_visible(c)), key=orden_grupo)
+        if claves:
+            reglas_list_panel.controls.extend(state["cards"][c] for c in claves)
+        elif state["cards"]:
+            reglas_list_panel.controls.append(ft.Text("No hay reglas para este laboratorio."))
+        else:
+            reglas_list_panel.controls.append(ft.Text("No hay reglas de horario definidas."))
+        if reglas_list_panel.page: reglas_list_panel.update()
+
+    def render_reglas():
+        """Carga completa: pide todas las reglas y reconstruye índice y tarjetas."""
         all_reglas = load_reglas_for_render()
 
         if not isinstance(all_reglas, list):
-            detail = all_reglas.get("detail", "Error") if isinstance(all_reglas, dict) else "Error desconocido"
+            detail = all_reglas.get("detail", all_reglas.get("error", "Error")) if isinstance(all_reglas, dict) else "Error desconocido"
+            state["cargadas"] = False
+            reglas_list_panel.controls.clear()
             reglas_list_panel.controls.append(ft.Text(f"Error al cargar reglas: {detail}", color=ft.Colors.ERROR))
-        elif not all_reglas:
-            reglas_list_panel.controls.append(ft.Text("No hay reglas de horario definidas."))
-        else:
-            # Group rules
-            grouped_rules = defaultdict(list)
-            for regla in all_reglas:
-                lab_id_key = regla.get('laboratorio_id') if regla.get('laboratorio_id') is not None else "general"
-                group_key = (
-                    lab_id_key,
-                    regla.get('hora_inicio'),
-                    regla.get('hora_fin'),
-                    regla.get('tipo_intervalo'),
-                    regla.get('es_habilitado')
-                )
-                grouped_rules[group_key].append(regla)
-
-            # Render groups and single rules
-            rendered_items = []
-            for group_key, rules_in_group in grouped_rules.items():
-                if len(rules_in_group) > 1:
-                    rules_in_group.sort(key=lambda r: r.get('dia_semana', -1))
-                    rendered_items.append(group_card(rules_in_group))
-                else:
-                    rendered_items.append(regla_card(rules_in_group[0]))
-
-            # Sort rendered cards
-            rendered_items.sort(key=lambda card: (
-                not card.content.controls[0].controls[0].value.startswith("General (Todos)"),
-                card.content.controls[0].controls[0].value
-            ))
+            if reglas_list_panel.page: reglas_list_panel.update()
+            return
 
-            reglas_list_panel.controls.extend(rendered_items)
+        state["indice"] = ReglasIndex(all_reglas)
+        state["conflictivas"] = state["indice"].conflictos()
+        state["grupos"] = GruposReglas(all_reglas)
+        state["cards"] = {clave: card_grupo(clave) for clave in state["grupos"].claves()}
+        state["firmas"] = {clave: firma_grupo(clave) for clave in state["cards"]}
+        state["cargadas"] = True
+        pintar_lista()
+
+    def aplicar_cambios(guardadas: List[dict], eliminadas: List[int]):
+        """Aplica un guardado/borrado al índice y rehace solo las tarjetas afectadas."""
+        if not state["cargadas"]:
+            render_reglas(); return
+        indice = state["indice"]
+        # Versión previa y nueva de cada regla tocada: marcan los (laboratorio, día) a revisar.
+        previas = [indice.get(rid) for rid in [*eliminadas, *(r.get("id") for r in guardadas)]]
+        tocadas = [r for r in [*previas, *guardadas] if r]
+        claves_indice = {ReglasIndex.clave(r) for r in tocadas}
+        antes = {r.get("id") for clave in claves_indice for r in indice.del_dia(*clave)}
+        for regla_id in eliminadas:
+            indice.quitar(regla_id)
+        for regla in guardadas:
+            indice.reemplazar(regla)
+        state["conflictivas"] = (state["conflictivas"] - antes) | indice.conflictos(claves_indice)
+
+        grupos = state["grupos"]
+        afectadas = grupos.aplicar(guardadas, eliminadas)
+        # Un cambio puede encender o apagar los avisos de otros grupos con reglas en el
+        # mismo alcance y día; si la regla es general, también los de laboratorio de ese día.
+        alcances = {GruposReglas.alcance(r) for r in tocadas}
+        dias_generales = {dia for lab, dia in alcances if lab == "general"}
+        alcances.update(a for a in grupos.alcances() if a[1] in dias_generales)
+        for clave in grupos.claves_en(alcances) - afectadas:
+            if firma_grupo(clave) != state["firmas"].get(clave):
+                afectadas.add(clave)
+
+        for clave in afectadas:
+            if clave in grupos:
+                state["cards"][clave] = card_grupo(clave)
+                state["firmas"][clave] = firma_grupo(clave)
+            else:
+                state["cards"].pop(clave, None)
+                state["firmas"].pop(clave, None)
+        pintar_lista()
 
-        if reglas_list_panel.page: reglas_list_panel.update()
+    def tras_reporte(reporte: dict):
+        if reporte.get("completo"):
+            aplicar_cambios(reporte["guardadas"], reporte["eliminadas"])
+        else:
+            render_reglas()  # falta alguna regla o no se sabe si una operación se aplicó: se recarga todo
 
     # --- MODIFIED: Clear Form ---
     def clear_form(e=None):
@@ -569,14 +678,36 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
             info_txt.update(); return
 
         # --- Determine Mode and Execute ---
-        success_count = 0
-        error_count = 0
-        delete_count = 0
-        last_error = ""
-        action_summary = ""
-
         es_habilitado_auto = (tipo_seleccionado == "disponible")
 
+        def payload_for(dia_num: int) -> dict:
+            return {
+                "laboratorio_id": lab_id, "dia_semana": dia_num,
+                "hora_inicio": inicio.isoformat(), "hora_fin": fin.isoformat(),
+                "es_habilitado": es_habilitado_auto, "tipo_intervalo": tipo_seleccionado,
+            }
+
+        # --- Validación local contra las reglas ya cargadas (sin ir al backend) ---
+        editando_ids = {r.get("id") for r in state["editing_group_rules"] or []}
+        if state["editing_single_rule_id"]:
+            editando_ids.add(state["editing_single_rule_id"])
+        choques = state["indice"].validar(lab_id, sorted(selected_dias_nums), inicio, fin, excluir_ids=editando_ids)
+        if choques:
+            detalle = "; ".join(
+                f"{DIAS_SEMANA_SHORT.get(dia, '?')}: " + ", ".join(
+                    f"{format_time_str(r.get('hora_inicio'))}-{format_time_str(r.get('hora_fin'))} ({r.get('tipo_intervalo')})"
+                    for r in reglas
+                )
+                for dia, reglas in choques.items()
+            )
+            alcance = "generales" if lab_id is None else "de ese laboratorio"
+            info_txt.value = f"Error: El horario se solapa con reglas {alcance} existentes. {detalle}"
+            info_txt.color = ft.Colors.ERROR
+            info_txt.update(); return
+
+        # Todas las operaciones del formulario van en un solo lote (ver ApiClient.batch_reglas_horario).
+        ops = []
+
         # Mode 1: Editing a Group
         if state["editing_group_rules"]:
             action_summary = "Actualizando Grupo: "
@@ -588,43 +719,16 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
             dias_to_delete = original_dias_nums.difference(selected_dias_nums)
             dias_to_create = selected_dias_nums.difference(original_dias_nums)
 
-            # Update existing days
-            for dia_num in dias_to_update:
+            for dia_num in sorted(dias_to_update):
                 rule_to_update = original_rule_map.get(dia_num)
                 if rule_to_update and rule_to_update.get("id"):
-                    payload = {
-                        "laboratorio_id": lab_id, "dia_semana": dia_num,
-                        "hora_inicio": inicio.isoformat(), "hora_fin": fin.isoformat(),
-                        "es_habilitado": es_habilitado_auto, "tipo_intervalo": tipo_seleccionado,
-                    }
-                    try:
-                        result = api.update_regla_horario(rule_to_update["id"], payload)
-                        if result and result.get("id"): success_count += 1
-                        else: error_count += 1; last_error = result.get("detail", "Update failed") if isinstance(result, dict) else "Update failed"
-                    except Exception as ex: error_count += 1; last_error = f"Update Ex: {ex}"
-
-            # Delete removed days
-            for dia_num in dias_to_delete:
-                 rule_to_delete = original_rule_map.get(dia_num)
-                 if rule_to_delete and rule_to_delete.get("id"):
-                    try:
-                        result = api.delete_regla_horario(rule_to_delete["id"])
-                        if result is True: delete_count += 1
-                        else: error_count += 1; last_error = result.get("detail", "Delete failed") if isinstance(result, dict) else "Delete failed"
-                    except Exception as ex: error_count += 1; last_error = f"Delete Ex: {ex}"
-
-            # Create added days
-            for dia_num in dias_to_create:
-                payload = {
-                    "laboratorio_id": lab_id, "dia_semana": dia_num,
-                    "hora_inicio": inicio.isoformat(), "hora_fin": fin.isoformat(),
-                    "es_habilitado": es_habilitado_auto, "tipo_intervalo": tipo_seleccionado,
-                }
-                try:
-                    result = api.create_regla_horario(payload)
-                    if result and result.get("id"): success_count += 1
-                    else: error_count += 1; last_error = result.get("detail", "Create failed") if isinstance(result, dict) else "Create failed"
-                except Exception as ex: error_count += 1; last_error = f"Create Ex: {ex}"
+                    ops.append(("actualizar", rule_to_update["id"], payload_for(dia_num)))
+            for dia_num in sorted(dias_to_delete):
+                rule_to_delete = original_rule_map.get(dia_num)
+                if rule_to_delete and rule_to_delete.get("id"):
+                    ops.append(("eliminar", rule_to_delete["id"], {"dia_semana": dia_num}))
+            for dia_num in sorted(dias_to_create):
+                ops.append(("crear", None, payload_for(dia_num)))
 
         # Mode 2: Editing a Single Rule
         elif state["editing_single_rule_id"]:
@@ -634,45 +738,26 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
                  info_txt.color=ft.Colors.ERROR
                  info_txt.update(); return
             dia_num = list(selected_dias_nums)[0]
-            payload = {
-                "laboratorio_id": lab_id, "dia_semana": dia_num,
-                "hora_inicio": inicio.isoformat(), "hora_fin": fin.isoformat(),
-                "es_habilitado": es_habilitado_auto, "tipo_intervalo": tipo_seleccionado,
-            }
-            try:
-                result = api.update_regla_horario(state["editing_single_rule_id"], payload)
-                if result and result.get("id"): success_count += 1
-                else: error_count += 1; last_error = result.get("detail", "Update failed") if isinstance(result, dict) else "Update failed"
-            except Exception as ex: error_count += 1; last_error = f"Update Ex: {ex}"
+            ops.append(("actualizar", state["editing_single_rule_id"], payload_for(dia_num)))
 
         # Mode 3: Creating New Rule(s)
         else:
             action_summary = "Creando Nueva(s) Regla(s): "
-            for dia_num in selected_dias_nums:
-                payload = {
-                    "laboratorio_id": lab_id, "dia_semana": dia_num,
-                    "hora_inicio": inicio.isoformat(), "hora_fin": fin.isoformat(),
-                    "es_habilitado": es_habilitado_auto, "tipo_intervalo": tipo_seleccionado,
-                }
-                try:
-                    result = api.create_regla_horario(payload)
-                    if result and result.get("id"): success_count += 1
-                    else: error_count += 1; last_error = result.get("detail", "Create failed") if isinstance(result, dict) else "Create failed"
-                except Exception as ex: error_count += 1; last_error = f"Create Ex: {ex}"
+            for dia_num in sorted(selected_dias_nums):
+                ops.append(("crear", None, payload_for(dia_num)))
+
+        reporte = api.batch_reglas_horario(ops)
 
         # --- Final Feedback ---
-        final_message = action_summary
-        if success_count > 0: final_message += f"{success_count} éxito(s). "
-        if delete_count > 0: final_message += f"{delete_count} eliminada(s). "
-        if error_count > 0:
-            final_message += f"{error_count} error(es). Último: {last_error}"
-            info_txt.color = ft.Colors.WARNING if success_count > 0 or delete_count > 0 else ft.Colors.ERROR
+        final_message = action_summary + resumen_reporte(reporte)
+        if reporte["fallos"]:
+            info_txt.color = ft.Colors.WARNING if sum(reporte["ok"].values()) else ft.Colors.ERROR
         else:
             info_txt.color = ft.Colors.GREEN
             clear_form()
 
         info_txt.value = final_message
-        render_reglas()
+        tras_reporte(reporte)
         info_txt.update()
         print(f"Save results: {final_message}")
 
@@ -712,7 +797,7 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
     render_reglas()
 
     # --- 6. Layout Final MEJORADO PARA MÓVIL ---
-    return ft.Column(
+    layout = ft.Column(
         [
             ft.Container(
                 ft.Text("Gestión de Reglas de Horario", 
@@ -723,6 +808,7 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
             form_card,
             info_txt,
             ft.Divider(height=10),
+            ft.ResponsiveRow([dd_filtro_lab]),
             ft.Container(
                 reglas_list_panel,
                 padding=ft.padding.only(bottom=20)  # Padding extra para móvil
@@ -732,4 +818,10 @@ def HorariosAdminView(page: ft.Page, api: ApiClient):
         alignment=ft.MainAxisAlignment.START, 
         spacing=15,
         scroll=ft.ScrollMode.ADAPTIVE  # Scroll suave en móvil
-    )
\ No newline at end of file
+    )
+
+    def refresh():
+        render_reglas()
+        page.update()
+
+    return with_refresh(layout, refresh)
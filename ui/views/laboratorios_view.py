@@ -1,6 +1,7 @@
 import flet as ft
 from api_client import ApiClient
 from ui.components.cards import Card
+from ui.view_cache import with_refresh
 from ui.components.inputs import TextField
 from ui.components.buttons import Primary, Ghost, Danger, Icon, Tonal
 
@@ -344,4 +345,8 @@ def LaboratoriosView(page: ft.Page, api: ApiClient):
     # ✅ ya se puede renderizar la lista
     render_list()
 
-    return layout
+    def refresh():
+        render_list()
+        page.update()
+
+    return with_refresh(layout, refresh)
@@ -1,8 +1,7 @@
 import flet as ft
-import os
-import base64
 
 from api_client import ApiClient
+from ui.asset_pipeline import image_url
 from ui.components.buttons import Primary, Ghost
 from ui.components.cards import Card
 
@@ -75,18 +74,10 @@ def LoginView(page: ft.Page, api: ApiClient, on_success, is_mobile: bool):
     pwd_field.on_change = validate
     validate(None)
 
-    # --- Logo (Base64) ---
-    LOGO_PATH = "ui/assets/a.png"
-    logo_b64 = None
-    try:
-        if os.path.exists(LOGO_PATH):
-            with open(LOGO_PATH, "rb") as image_file:
-                logo_b64 = base64.b64encode(image_file.read()).decode("utf-8")
-    except Exception as e:
-        print(f"Error logo: {e}")
-
-    if logo_b64:
-        logo_content = ft.Image(src_base64=logo_b64, fit=ft.ImageFit.COVER)
+    # --- Logo (servido desde assets_dir, generado una vez por proceso) ---
+    logo_src = image_url("logo", is_mobile)
+    if logo_src:
+        logo_content = ft.Image(src=logo_src, fit=ft.ImageFit.COVER)
     else:
         logo_content = ft.Icon(ft.Icons.SCIENCE, size=34, color=THEME_CYAN)
 
@@ -126,31 +117,12 @@ def LoginView(page: ft.Page, api: ApiClient, on_success, is_mobile: bool):
 
     # --- FONDO ---
     default_bg_url = "https://images.unsplash.com/photo-1614850523459-c2f4c699c52e?q=80&w=2070&auto=format&fit=crop"
-    local_bg_options = ["ui/assets/background.jpg", "ui/assets/dark_abstract_background.jpg"]
-    bg_src_base64 = None
-
-    for local_path in local_bg_options:
-        if os.path.exists(local_path):
-            try:
-                with open(local_path, "rb") as f:
-                    bg_src_base64 = base64.b64encode(f.read()).decode("utf-8")
-                    break
-            except Exception:
-                pass
-
-    if bg_src_base64:
-        bg_image_control = ft.Image(
-            src_base64=bg_src_base64,
-            fit=ft.ImageFit.COVER,
-            opacity=0.6
-        )
-    else:
-        bg_image_control = ft.Image(
-            src=default_bg_url,
-            fit=ft.ImageFit.COVER,
-            opacity=0.6,
-            error_content=ft.Container(bgcolor=THEME_BG)
-        )
+    bg_image_control = ft.Image(
+        src=image_url("login_background", is_mobile) or default_bg_url,
+        fit=ft.ImageFit.COVER,
+        opacity=0.6,
+        error_content=ft.Container(bgcolor=THEME_BG)
+    )
 
     # --- TARJETA DE LOGIN (CONFIGURACIÓN WEB POR DEFECTO) ---
     card_width = 440     # Ancho fijo para escritorio
@@ -1,6 +1,7 @@
 import flet as ft
 from api_client import ApiClient
 from ui.components.cards import Card
+from ui.view_cache import with_refresh
 from ui.components.inputs import TextField
 from ui.components.buttons import Primary, Ghost, Icon, Danger, Tonal
 
@@ -265,8 +266,12 @@ def PlantelesView(page: ft.Page, api: ApiClient):
     # -----------------------------------------------------
     # ✅ RETORNO FINAL — SCROLL GLOBAL EN MÓVIL
     # -----------------------------------------------------
+    def refresh():
+        render_list()
+        page.update()
+
     if is_mobile:
-        return ft.ListView(
+        return with_refresh(ft.ListView(
             controls=[
                 ft.Text("Gestión de Planteles", size=title_size, weight=ft.FontWeight.BOLD),
                 add_section,
@@ -277,10 +282,10 @@ def PlantelesView(page: ft.Page, api: ApiClient):
             expand=True,
             spacing=12,
             padding=10
-        )
+        ), refresh)
 
     # ✅ Version web normal
-    return ft.Column(
+    return with_refresh(ft.Column(
         [
             ft.Text("Gestión de Planteles", size=title_size, weight=ft.FontWeight.BOLD),
             add_section,
@@ -290,4 +295,4 @@ def PlantelesView(page: ft.Page, api: ApiClient):
         ],
         expand=True,
         spacing=15
-    )
\ No newline at end of file
+    ), refresh)
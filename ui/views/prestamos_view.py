@@ -1,17 +1,32 @@
 from __future__ import annotations
 
 import flet as ft
-from api_client import ApiClient
+from api_client import ApiClient, RECURSOS_SERVER_PAGING
+from catalogo import Catalogo
+from inventario import Inventario
+from ocupacion import OcupacionRecursos
 from datetime import datetime, time, timedelta
 import traceback
 
 from ui.components.cards import Card
+from ui.view_cache import with_refresh
 from ui.components.buttons import Primary, Ghost, Tonal, Danger
 from ui.components.inputs import TextField
+from ui.components.paged_list import PagedList
 
 CLASS_START = time(7, 0)
 CLASS_END = time(14, 30)
 MAX_LOAN_HOURS = 7
+RECURSOS_PAGE_SIZE = 30
+# Las listas de recursos dejan construidas solo RECURSOS_MAX_PAGES páginas (ver
+# PagedList). Para eso cada fila mide exactamente su extent (px, incluido el
+# espacio entre tarjetas); los textos largos se cortan con "…" en vez de crecer.
+RECURSOS_MAX_PAGES = 3
+RECURSO_ROW_GAP = 10
+RECURSO_ITEM_EXTENT = 100
+RECURSO_ITEM_EXTENT_MOBILE = 150
+ADMIN_RECURSO_ITEM_EXTENT = 130
+ADMIN_RECURSO_ITEM_EXTENT_MOBILE = 170
 
 def PrestamosView(page: ft.Page, api: ApiClient):
     user_session = page.session.get("user_session") or {}
@@ -50,6 +65,7 @@ def PrestamosView(page: ft.Page, api: ApiClient):
         "active_tab": 0,
         "solicitar_recurso_id": None,
         "is_mobile": detect_mobile(),
+        "ocupacion": OcupacionRecursos([]),
     }
 
     small_style = {
@@ -58,12 +74,10 @@ def PrestamosView(page: ft.Page, api: ApiClient):
         "text_style": ft.TextStyle(size=14),
     }
 
-    recursos_list_display = ft.Column(spacing=10, scroll=ft.ScrollMode.ADAPTIVE, expand=True)
     solicitudes_list_display = ft.Column(spacing=10, scroll=ft.ScrollMode.ADAPTIVE, expand=True)
     error_display = ft.Text("", color=PAL["error_text"])
 
-    planteles_cache = []
-    labs_cache = []
+    catalogo = None
     tipos_cache = []
     error_loading_data = None
 
@@ -72,22 +86,16 @@ def PrestamosView(page: ft.Page, api: ApiClient):
     tipo_options = [ft.dropdown.Option("", "Todos")]
 
     try:
-        planteles_data = api.get_planteles()
-        labs_data = api.get_laboratorios()
-        tipos_data = api.get_recurso_tipos()
-        if isinstance(planteles_data, list):
-            planteles_cache = planteles_data
+        catalogo_data, tipos_data = api.gather(api.get_catalogo, api.get_recurso_tipos)
+        if isinstance(catalogo_data, Catalogo):
+            catalogo = catalogo_data
             plantel_options.extend([
-                ft.dropdown.Option(str(p["id"]), p["nombre"]) for p in planteles_cache if p.get("id")
+                ft.dropdown.Option(str(p["id"]), p["nombre"]) for p in catalogo.planteles
             ])
         else:
-            detail = planteles_data.get("error", "Error") if isinstance(planteles_data, dict) else "Respuesta inválida"
-            error_loading_data = f"Error al cargar planteles: {detail}"
-        if isinstance(labs_data, list):
-            labs_cache = labs_data
-        elif error_loading_data is None:
-            detail = labs_data.get("error", "Error") if isinstance(labs_data, dict) else "Respuesta inválida"
-            error_loading_data = f"Error al cargar laboratorios: {detail}"
+            detail = catalogo_data.get("error", "Error") if isinstance(catalogo_data, dict) else "Respuesta inválida"
+            nombre = catalogo_data.get("catalogo", "catálogos") if isinstance(catalogo_data, dict) else "catálogos"
+            error_loading_data = f"Error al cargar {nombre}: {detail}"
         if isinstance(tipos_data, list):
             tipos_cache = tipos_data
             tipo_options.extend([ft.dropdown.Option(t, t.capitalize()) for t in tipos_cache if t])
@@ -137,19 +145,10 @@ def PrestamosView(page: ft.Page, api: ApiClient):
     dd_recurso_estado_admin.col = {"sm": 12, "md": 4}
 
     lab_options_admin = []
-    plantel_map_for_admin = {p["id"]: p["nombre"] for p in planteles_cache if p.get("id")}
-    labs_grouped = {}
-    for lab in labs_cache:
-        pid = lab.get("plantel_id")
-        if pid in plantel_map_for_admin:
-            if pid not in labs_grouped:
-                labs_grouped[pid] = []
-            labs_grouped[pid].append(lab)
-    for pid, pname in plantel_map_for_admin.items():
-        lab_options_admin.append(ft.dropdown.Option(key=None, text=pname, disabled=True))
-        if pid in labs_grouped:
-            for l in sorted(labs_grouped[pid], key=lambda x: x.get("nombre", "")):
-                lab_options_admin.append(ft.dropdown.Option(key=str(l["id"]), text=f"  {l['nombre']}"))
+    for p in catalogo.planteles:
+        lab_options_admin.append(ft.dropdown.Option(key=None, text=p["nombre"], disabled=True))
+        for l in sorted(catalogo.labs_de_plantel(p["id"]), key=lambda x: x.get("nombre", "")):
+            lab_options_admin.append(ft.dropdown.Option(key=str(l["id"]), text=f"  {l['nombre']}"))
 
     dd_recurso_lab_admin = ft.Dropdown(label="Laboratorio de Origen", options=lab_options_admin)
     dd_recurso_lab_admin.col = {"sm": 12, "md": 9}
@@ -161,7 +160,6 @@ def PrestamosView(page: ft.Page, api: ApiClient):
     btn_recurso_cancel.visible = False
     btn_recurso_cancel.col = {"sm": 6, "md": "auto"}
 
-    recursos_admin_list_display = ft.Column(spacing=10, scroll=ft.ScrollMode.ADAPTIVE, expand=True)
     admin_form_container = ft.ResponsiveRow(
         [
             tf_recurso_tipo,
@@ -174,49 +172,87 @@ def PrestamosView(page: ft.Page, api: ApiClient):
         spacing=10,
     )
 
+    # Las listas de recursos se paginan: solo se construyen las tarjetas que el
+    # scroll va alcanzando y, con filas de alto fijo, solo unas pocas páginas a la vez.
+    def fetch_recursos_page(offset: int, limit: int):
+        return api.get_recursos(state["filter_plantel_id"], state["filter_lab_id"], state["filter_estado"], state["filter_tipo"],
+                                offset=offset, limit=limit)
+
+    def fila_fija(lista: PagedList, tile: ft.Control) -> ft.Control:
+        return ft.Container(tile, height=lista.item_extent, padding=ft.padding.only(bottom=RECURSO_ROW_GAP))
+
+    def ajustar_filas():
+        """Alto de fila de cada lista según el layout actual; se fija antes de cada reset."""
+        mobile = state["is_mobile"]
+        recursos_list_display.item_extent = RECURSO_ITEM_EXTENT_MOBILE if mobile else RECURSO_ITEM_EXTENT
+        recursos_admin_list_display.item_extent = ADMIN_RECURSO_ITEM_EXTENT_MOBILE if mobile else ADMIN_RECURSO_ITEM_EXTENT
+
+    def build_recurso_item(r):
+        if not isinstance(r, dict):
+            return None
+        state["ocupacion"].marcar(r)
+        tile = recurso_tile_mobile(r) if state["is_mobile"] else recurso_tile(r)
+        return fila_fija(recursos_list_display, tile)
+
+    recursos_list_display = PagedList(
+        fetch_recursos_page,
+        build_recurso_item,
+        page_size=RECURSOS_PAGE_SIZE,
+        empty_text="No se encontraron recursos con los filtros seleccionados.",
+        max_pages=RECURSOS_MAX_PAGES,
+        expand=True,
+    )
+
+    def build_admin_recurso_item(r):
+        if not isinstance(r, dict):
+            return None
+        tile = admin_recurso_tile_mobile(r) if state["is_mobile"] else admin_recurso_tile(r)
+        return fila_fija(recursos_admin_list_display, tile)
+
+    recursos_admin_list_display = PagedList(
+        lambda offset, limit: api.get_recursos(offset=offset, limit=limit),
+        build_admin_recurso_item,
+        page_size=RECURSOS_PAGE_SIZE,
+        empty_text="No hay recursos creados.",
+        max_pages=RECURSOS_MAX_PAGES,
+        expand=True,
+    )
+    ajustar_filas()
+
+    def cargar_foto(lista: PagedList, recursos):
+        # Todas las páginas salen de esta misma lista aunque la caché expire a mitad del scroll.
+        if isinstance(recursos, list):
+            lista.reset(items=recursos)
+        else:
+            lista.reset(recursos)
+
+    def aplicar_filtros():
+        """
+        Resuelve los filtros sobre el inventario indexado (sin red mientras
+        esté fresco) y pagina esa foto; si el inventario no cargó, descarga la
+        lista filtrada una vez. Si el backend pagina, pide las páginas a /recursos.
+        """
+        ajustar_filas()
+        if RECURSOS_SERVER_PAGING:
+            recursos_list_display.reset(fetch_recursos_page(0, RECURSOS_PAGE_SIZE))
+            return
+        filtros = (state["filter_plantel_id"], state["filter_lab_id"], state["filter_estado"], state["filter_tipo"])
+        inventario = api.get_inventario()
+        if isinstance(inventario, Inventario):
+            cargar_foto(recursos_list_display, inventario.filtrar(*filtros))
+        else:
+            cargar_foto(recursos_list_display, api.get_recursos(*filtros))
+
     def render_recursos():
-        recursos_list_display.controls.clear()
         error_display.value = ""
-        ocupados_global = api.get_recursos_ocupados_ids(include_all=True) or set()
-        ocupados_mios = api.get_recursos_ocupados_ids(include_all=False) or set()
-        recursos_data = api.get_recursos(
-            plantel_id=state["filter_plantel_id"],
-            lab_id=state["filter_lab_id"],
-            estado=state["filter_estado"],
-            tipo=state["filter_tipo"],
+        if error_display.page:
+            error_display.update()
+        ocupacion, _ = api.gather(
+            (api.get_ocupacion, user_data.get("id"), is_admin),
+            (fetch_recursos_page, 0, RECURSOS_PAGE_SIZE) if RECURSOS_SERVER_PAGING else api.get_inventario,
         )
-        if isinstance(recursos_data, dict) and "error" in recursos_data:
-            detail = recursos_data.get("error", "Error")
-            error_display.value = f"Error al cargar recursos: {detail}"
-            if error_display.page:
-                error_display.update()
-            if recursos_list_display.page:
-                recursos_list_display.update()
-            return
-        if not isinstance(recursos_data, list):
-            error_display.value = "Error al cargar recursos: Respuesta inválida del API"
-            if error_display.page:
-                error_display.update()
-            if recursos_list_display.page:
-                recursos_list_display.update()
-            return
-        recursos = recursos_data
-        if not recursos:
-            recursos_list_display.controls.append(
-                ft.Text("No se encontraron recursos con los filtros seleccionados.", color=PAL["muted_text"])
-            )
-        else:
-            for r in recursos:
-                if isinstance(r, dict):
-                    rid = r.get("id")
-                    r["_ocupado"] = bool(rid in ocupados_global)
-                    r["_ya_solicitado"] = bool(rid in ocupados_mios)
-                    if state["is_mobile"]:
-                        recursos_list_display.controls.append(recurso_tile_mobile(r))
-                    else:
-                        recursos_list_display.controls.append(recurso_tile(r))
-        if page:
-            page.update()
+        state["ocupacion"] = ocupacion if isinstance(ocupacion, OcupacionRecursos) else OcupacionRecursos([])
+        aplicar_filtros()
 
     def render_solicitudes():
         solicitudes_list_display.controls.clear()
@@ -253,36 +289,14 @@ def PrestamosView(page: ft.Page, api: ApiClient):
             page.update()
 
     def render_admin_recursos():
-        recursos_admin_list_display.controls.clear()
         error_display.value = ""
-        recursos_data = api.get_recursos()
-        if isinstance(recursos_data, dict) and "error" in recursos_data:
-            detail = recursos_data.get("error", "Error")
-            error_display.value = f"Error al cargar lista de admin: {detail}"
-            if error_display.page:
-                error_display.update()
-            if recursos_admin_list_display.page:
-                recursos_admin_list_display.update()
-            return
-        if not isinstance(recursos_data, list):
-            error_display.value = "Error al cargar lista de admin: Respuesta inválida del API"
-            if error_display.page:
-                error_display.update()
-            if recursos_admin_list_display.page:
-                recursos_admin_list_display.update()
-            return
-        recursos = recursos_data
-        if not recursos:
-            recursos_admin_list_display.controls.append(ft.Text("No hay recursos creados."))
+        if error_display.page:
+            error_display.update()
+        ajustar_filas()
+        if RECURSOS_SERVER_PAGING:
+            recursos_admin_list_display.reset()
         else:
-            for r in recursos:
-                if isinstance(r, dict):
-                    if state["is_mobile"]:
-                        recursos_admin_list_display.controls.append(admin_recurso_tile_mobile(r))
-                    else:
-                        recursos_admin_list_display.controls.append(admin_recurso_tile(r))
-        if recursos_admin_list_display.page:
-            recursos_admin_list_display.update()
+            cargar_foto(recursos_admin_list_display, api.get_recursos())
 
     def on_filter_change(e):
         pid_val = dd_plantel_filter.value
@@ -291,7 +305,7 @@ def PrestamosView(page: ft.Page, api: ApiClient):
         else:
             state["filter_plantel_id"] = None
         if state["filter_plantel_id"]:
-            labs_filtrados = [l for l in labs_cache if l.get("plantel_id") == state["filter_plantel_id"]]
+            labs_filtrados = catalogo.labs_de_plantel(state["filter_plantel_id"])
             dd_lab_filter.options = [ft.dropdown.Option("", "Todos")] + [
                 ft.dropdown.Option(str(l["id"]), l["nombre"]) for l in labs_filtrados if l.get("id")
             ]
@@ -303,7 +317,7 @@ def PrestamosView(page: ft.Page, api: ApiClient):
         state["filter_lab_id"] = None
         state["filter_estado"] = dd_estado_filter.value or ""
         state["filter_tipo"] = dd_tipo_filter.value or ""
-        render_recursos()
+        aplicar_filtros()
 
     def on_lab_filter_change(e):
         lid_val = dd_lab_filter.value
@@ -313,7 +327,7 @@ def PrestamosView(page: ft.Page, api: ApiClient):
             state["filter_lab_id"] = None
         state["filter_estado"] = dd_estado_filter.value or ""
         state["filter_tipo"] = dd_tipo_filter.value or ""
-        render_recursos()
+        aplicar_filtros()
 
     dd_plantel_filter.on_change = on_filter_change
     dd_lab_filter.on_change = on_lab_filter_change
@@ -442,11 +456,10 @@ def PrestamosView(page: ft.Page, api: ApiClient):
 
     def recurso_tile_mobile(r: dict):
         lab_id = r.get("laboratorio_id")
-        lab = next((l for l in labs_cache if l.get("id") == lab_id), {})
-        plantel_id = lab.get("plantel_id")
-        plantel = next((p for p in planteles_cache if p.get("id") == plantel_id), {})
-        title = ft.Text(f"{r.get('tipo', 'Recurso').capitalize()} #{r.get('id', 'N/A')}", size=15, weight=ft.FontWeight.W_600)
-        subtitle = ft.Text(f"Plantel: {plantel.get('nombre', '-')}\nLab: {lab.get('nombre', '-')}", size=11, opacity=0.85)
+        lab = catalogo.lab(lab_id)
+        plantel = catalogo.plantel_de_lab(lab_id)
+        title = ft.Text(f"{r.get('tipo', 'Recurso').capitalize()} #{r.get('id', 'N/A')}", size=15, weight=ft.FontWeight.W_600, max_lines=1, overflow=ft.TextOverflow.ELLIPSIS, expand=True)
+        subtitle = ft.Text(f"Plantel: {plantel.get('nombre', '-')}\nLab: {lab.get('nombre', '-')}", size=11, opacity=0.85, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS)
         estado_actual = r.get("estado")
         if estado_actual != "disponible":
             btn = ft.OutlinedButton(f"{estado_actual.capitalize()}", height=34, expand=True, disabled=True)
@@ -507,11 +520,10 @@ def PrestamosView(page: ft.Page, api: ApiClient):
 
     def recurso_tile(r: dict):
         lab_id = r.get("laboratorio_id")
-        lab = next((l for l in labs_cache if l.get("id") == lab_id), {})
-        plantel_id = lab.get("plantel_id")
-        plantel = next((p for p in planteles_cache if p.get("id") == plantel_id), {})
-        title = ft.Text(f"{r.get('tipo', 'Recurso').capitalize()} #{r.get('id', 'N/A')}", size=15, weight=ft.FontWeight.W_600)
-        subtitle = ft.Text(f"Plantel: {plantel.get('nombre', '-')}\nLab: {lab.get('nombre', '-')}", size=12, opacity=0.8)
+        lab = catalogo.lab(lab_id)
+        plantel = catalogo.plantel_de_lab(lab_id)
+        title = ft.Text(f"{r.get('tipo', 'Recurso').capitalize()} #{r.get('id', 'N/A')}", size=15, weight=ft.FontWeight.W_600, max_lines=1, overflow=ft.TextOverflow.ELLIPSIS)
+        subtitle = ft.Text(f"Plantel: {plantel.get('nombre', '-')}\nLab: {lab.get('nombre', '-')}", size=12, opacity=0.8, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS)
         estado_actual = r.get("estado")
         if estado_actual != "disponible":
             btn = ft.OutlinedButton(f"{estado_actual.capitalize()}", disabled=True)
@@ -563,11 +575,10 @@ def PrestamosView(page: ft.Page, api: ApiClient):
 
     def admin_recurso_tile(r: dict):
         lab_id = r.get("laboratorio_id")
-        lab = next((l for l in labs_cache if l.get("id") == lab_id), {})
-        plantel_id = lab.get("plantel_id")
-        plantel = next((p for p in planteles_cache if p.get("id") == plantel_id), {})
-        title = ft.Text(f"{r.get('tipo', 'Recurso').capitalize()} #{r.get('id', 'N/A')}", size=15, weight=ft.FontWeight.W_600)
-        subtitle = ft.Text(f"Plantel: {plantel.get('nombre', '-')}\nLab: {lab.get('nombre', '-')}", size=12, opacity=0.8)
+        lab = catalogo.lab(lab_id)
+        plantel = catalogo.plantel_de_lab(lab_id)
+        title = ft.Text(f"{r.get('tipo', 'Recurso').capitalize()} #{r.get('id', 'N/A')}", size=15, weight=ft.FontWeight.W_600, max_lines=1, overflow=ft.TextOverflow.ELLIPSIS)
+        subtitle = ft.Text(f"Plantel: {plantel.get('nombre', '-')}\nLab: {lab.get('nombre', '-')}", size=12, opacity=0.8, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS)
         actions = ft.Row(
             [
                 Tonal("Editar", icon=ft.Icons.EDIT_OUTLINED, on_click=lambda e, _r=r: edit_recurso_click(_r), height=36),
@@ -579,11 +590,10 @@ def PrestamosView(page: ft.Page, api: ApiClient):
 
     def admin_recurso_tile_mobile(r: dict):
         lab_id = r.get("laboratorio_id")
-        lab = next((l for l in labs_cache if l.get("id") == lab_id), {})
-        plantel_id = lab.get("plantel_id")
-        plantel = next((p for p in planteles_cache if p.get("id") == plantel_id), {})
-        title = ft.Text(f"{r.get('tipo', 'Recurso').capitalize()} #{r.get('id', 'N/A')}", size=15, weight=ft.FontWeight.W_600)
-        subtitle = ft.Text(f"Plantel: {plantel.get('nombre', '-')}\nLab: {lab.get('nombre', '-')}", size=11, opacity=0.85)
+        lab = catalogo.lab(lab_id)
+        plantel = catalogo.plantel_de_lab(lab_id)
+        title = ft.Text(f"{r.get('tipo', 'Recurso').capitalize()} #{r.get('id', 'N/A')}", size=15, weight=ft.FontWeight.W_600, max_lines=1, overflow=ft.TextOverflow.ELLIPSIS, expand=True)
+        subtitle = ft.Text(f"Plantel: {plantel.get('nombre', '-')}\nLab: {lab.get('nombre', '-')}", size=11, opacity=0.85, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS)
         estado_chip = chip_estado(r.get("estado"))
         actions = ft.Row(
             [
@@ -818,7 +828,6 @@ def PrestamosView(page: ft.Page, api: ApiClient):
             recursos_admin_list_display,
         ],
         expand=True,
-        scroll=ft.ScrollMode.ADAPTIVE,
     )
 
     tab_admin_recursos = ft.Tab(
@@ -885,7 +894,8 @@ def PrestamosView(page: ft.Page, api: ApiClient):
     page.on_resize = _on_resize
     apply_filter_styles()
 
-    if state["is_mobile"]:
-        return mobile_layout()
-    else:
-        return desktop_layout()
+    def refresh():
+        render_recursos()
+        render_solicitudes()
+
+    return with_refresh(mobile_layout() if state["is_mobile"] else desktop_layout(), refresh)
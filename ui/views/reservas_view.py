@@ -3,8 +3,11 @@
 import flet as ft
 from datetime import datetime, date, time, timedelta
 from api_client import ApiClient
+from agenda import DiaAgenda, Reserva, Slot
+from catalogo import Catalogo
 from ui.components.buttons import Primary, Tonal, Icon, Danger, Ghost
 from ui.components.cards import Card
+from ui.view_cache import with_refresh
 from dataclasses import dataclass
 import traceback
 
@@ -29,7 +32,7 @@ def ReservasView(page: ft.Page, api: ApiClient):
     state = {
         "confirm_for": None, 
         "is_mobile": get_is_mobile(),
-        "selected_date": date.today(),
+        "selected_date": None,
         "show_filters": False
     }
 
@@ -68,47 +71,26 @@ def ReservasView(page: ft.Page, api: ApiClient):
         render()
 
     # CARGAR DATOS INICIALES
-    planteles_cache = []
-    labs_cache = []
-    lab_map = {}
+    catalogo = None
     error_loading_data = None
 
     try:
-        planteles_data = api.get_planteles()
-        labs_data = api.get_laboratorios()
+        catalogo_data = api.get_catalogo()
 
-        if isinstance(planteles_data, list):
-            planteles_cache = planteles_data
+        if isinstance(catalogo_data, Catalogo):
+            catalogo = catalogo_data
             dd_plantel.options = [
                 ft.dropdown.Option(str(p["id"]), p["nombre"])
-                for p in planteles_cache
-                if p.get("id")
+                for p in catalogo.planteles
             ]
         else:
             error_detail = (
-                planteles_data.get("error", "Error")
-                if isinstance(planteles_data, dict)
+                catalogo_data.get("error", "Error")
+                if isinstance(catalogo_data, dict)
                 else "Respuesta inesperada"
             )
-            error_loading_data = f"Error al cargar planteles: {error_detail}"
-
-        if isinstance(labs_data, list):
-            labs_cache = labs_data
-            lab_map = {
-                str(l.get("id", "")): l.get("nombre", "Nombre Desconocido")
-                for l in labs_cache
-                if l.get("id")
-            }
-        else:
-            error_detail = (
-                labs_data.get("error", "Error")
-                if isinstance(labs_data, dict)
-                else "Respuesta inesperada"
-            )
-            if error_loading_data:
-                error_loading_data += f"\nError al cargar laboratorios: {error_detail}"
-            else:
-                error_loading_data = f"Error al cargar laboratorios: {error_detail}"
+            nombre = catalogo_data.get("catalogo", "catálogos") if isinstance(catalogo_data, dict) else "catálogos"
+            error_loading_data = f"Error al cargar {nombre}: {error_detail}"
 
     except Exception as e:
         error_loading_data = f"Excepción al cargar datos iniciales: {e}"
@@ -139,6 +121,7 @@ def ReservasView(page: ft.Page, api: ApiClient):
 
     today = date.today()
     window = {"start": today if not is_weekend(today) else next_weekday(today)}
+    state["selected_date"] = window["start"]
 
     day_names_short = ["Lun", "Mar", "Mié", "Jue", "Vie"]
     day_names_full = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
@@ -205,6 +188,132 @@ def ReservasView(page: ft.Page, api: ApiClient):
     def slot_label(s: datetime, f: datetime):
         return f"{s.strftime('%H:%M')}–{f.strftime('%H:%M')}"
 
+    # SLOTS CON CLAVE ESTABLE
+    # Cada slot vive en un Container con clave (lab, día, inicio); tras crear o
+    # cancelar una reserva solo se reemplaza el contenido de los que cambian.
+    slot_controls = {}  # (lid, date, inicio) -> {"control": ft.Container, "firma": tuple}
+    reserva_dia = {}  # reserva_id -> date
+
+    def slot_tile(lid: int, slot: Slot, reserva: Reserva | None):
+        """Control del slot y su firma (lo que determina cómo se ve)."""
+        is_mobile_view = state["is_mobile"]
+        label = slot_label(slot.inicio, slot.fin)
+
+        if reserva:
+            rid = reserva.id
+            nombre = reserva.usuario_nombre
+            can_manage = reserva.puede_gestionar
+            confirming = can_manage and state["confirm_for"] == rid
+            firma = ("reservado", rid, nombre, can_manage, confirming, is_mobile_view)
+
+            # Versión móvil compacta
+            display_label = f"🟡 {label} - {nombre}" if is_mobile_view else f"Reservado por {nombre}"
+
+            if confirming:
+                # Botones de confirmación adaptados a móvil
+                if is_mobile_view:
+                    return ft.Column([
+                        ft.Text("¿Cancelar reserva?", size=14, weight=ft.FontWeight.BOLD),
+                        ft.Row([
+                            Danger(
+                                "Sí, cancelar",
+                                on_click=lambda _, _rid=rid: do_cancel_reservation(_rid),
+                                expand=True,
+                                height=40,
+                            ),
+                            Ghost(
+                                "No",
+                                on_click=lambda e: set_confirm(None),
+                                expand=True,
+                                height=40,
+                            ),
+                        ])
+                    ], spacing=8), firma
+                return ft.Row([
+                    Danger("Confirmar", on_click=lambda _, _rid=rid: do_cancel_reservation(_rid)),
+                    Ghost("Volver", on_click=lambda e: set_confirm(None)),
+                ]), firma
+
+            return Tonal(
+                display_label,
+                tooltip="Toca para cancelar" if can_manage else "No puedes cancelar esta reserva",
+                on_click=lambda _, _rid=rid, _lab=label: ask_inline_cancel(_rid, _lab) if can_manage and _rid else None,
+                disabled=not can_manage,
+                expand=is_mobile_view,
+                height=44 if is_mobile_view else 50,
+            ), firma
+
+        if slot.disponible:
+            is_allowed_to_create = user_data.get("rol") in ["admin", "docente"]
+            display_label = f"🟢 {label}" if is_mobile_view else label
+
+            reserve_button = Primary(
+                display_label,
+                on_click=lambda _, ss=slot.inicio, ff=slot.fin, _lid=lid: do_create_reservation(_lid, ss, ff) if is_allowed_to_create else None,
+                disabled=not is_allowed_to_create,
+                expand=is_mobile_view,
+                height=44 if is_mobile_view else 50,
+            )
+            reserve_button.tooltip = "Solo admin/docente pueden reservar" if not is_allowed_to_create else None
+            return reserve_button, ("disponible", is_mobile_view)
+
+        display_label = f"🔴 {label}" if is_mobile_view else f"{slot.tipo.capitalize()} {label}"
+        return Tonal(
+            display_label,
+            disabled=True,
+            expand=is_mobile_view,
+            height=44 if is_mobile_view else 50,
+        ), (slot.tipo, is_mobile_view)
+
+    def patch_day(lid: int, d: date) -> bool:
+        """
+        Vuelve a leer la agenda del día (solo ese día se descarga si se
+        invalidó) y reemplaza el contenido de los slots que cambiaron. Devuelve
+        False si el día no está en pantalla o sus slots ya no coinciden.
+        """
+        agenda = api.get_agenda(lid, [d], user_data)
+        if "error" in agenda:
+            origen = agenda.get("agenda", "horario")
+            info.value = f"Error al cargar {origen}: {agenda.get('error')}"
+            info.color = ft.Colors.ERROR
+            return True
+
+        dia = agenda[d]
+        if any((lid, d, slot.inicio) not in slot_controls for slot in dia.slots):
+            return False
+
+        changed = []
+        for slot in dia.slots:
+            reserva = dia.por_inicio.get(slot.inicio)
+            if reserva and reserva.id is not None:
+                reserva_dia[reserva.id] = d
+            holder = slot_controls[(lid, d, slot.inicio)]
+            control, firma = slot_tile(lid, slot, reserva)
+            if firma != holder["firma"]:
+                holder["control"].content = control
+                holder["firma"] = firma
+                changed.append(holder["control"])
+        if changed and grid.page:
+            page.update(*changed)
+        return True
+
+    def set_confirm(rid):
+        """Cambia el slot en confirmación de cancelación, parcheando solo los días afectados."""
+        previous = state["confirm_for"]
+        state["confirm_for"] = rid
+        if rid is None:
+            info.value = ""
+            info.color = None
+        if not dd_lab.value or not dd_lab.value.isdigit():
+            return
+        lid = int(dd_lab.value)
+        for d in {reserva_dia.get(previous), reserva_dia.get(rid)} - {None}:
+            if not patch_day(lid, d):
+                render()
+                return
+        if info.page:
+            info.update()
+
     # FUNCIONES DE RESERVA
     def do_create_reservation(lab_id: int, s: datetime, f: datetime):
         if user_data.get("rol") not in ["admin", "docente"]:
@@ -233,7 +342,9 @@ def ReservasView(page: ft.Page, api: ApiClient):
             info.value = "Reserva creada con éxito."
             info.color = ft.Colors.GREEN_500
             state["confirm_for"] = None
-            render()
+            if not patch_day(lab_id, s.date()):
+                render()
+                return
         else:
             error_detail = (
                 result.get("error", "Error")
@@ -242,7 +353,7 @@ def ReservasView(page: ft.Page, api: ApiClient):
             )
             info.value = f"Error al crear la reserva: {error_detail}"
             info.color = ft.Colors.ERROR
-            page.update(info, grid)
+        page.update(info, grid)
 
     def do_cancel_reservation(rid: int):
         info.value = "Cancelando reserva, por favor espera..."
@@ -259,7 +370,10 @@ def ReservasView(page: ft.Page, api: ApiClient):
         if result and "error" not in result:
             info.value = "Reserva cancelada exitosamente."
             info.color = ft.Colors.GREEN_500
-            render()
+            d = reserva_dia.pop(rid, None)
+            if d is None or not dd_lab.value or not patch_day(int(dd_lab.value), d):
+                render()
+                return
         else:
             error_detail = (
                 result.get("error", "Error")
@@ -268,16 +382,15 @@ def ReservasView(page: ft.Page, api: ApiClient):
             )
             info.value = f"Error al cancelar la reserva: {error_detail}"
             info.color = ft.Colors.ERROR
-            page.update(info, grid)
+        page.update(info, grid)
 
     def ask_inline_cancel(rid: int, etiqueta: str):
-        state["confirm_for"] = rid
         info.value = f"Confirmar cancelación para {etiqueta}"
         info.color = ft.Colors.AMBER_700
-        render()
+        set_confirm(rid)
 
     # SECCIÓN DE DÍA
-    def day_section(d: date, lid: int, slots_calculados: list[dict], day_reserveds: list[dict]):
+    def day_section(d: date, lid: int, dia: DiaAgenda):
         is_mobile_view = state["is_mobile"]
         
         # Header del día
@@ -297,104 +410,14 @@ def ReservasView(page: ft.Page, api: ApiClient):
         )
 
         tiles = []
-        reservas_map = {}
-        
-        for r in day_reserveds:
-            try:
-                dt_aware_utc = datetime.fromisoformat(str(r.get("inicio")).replace("Z", "+00:00"))
-                dt_naive_local = dt_aware_utc.astimezone(None).replace(tzinfo=None)
-                reservas_map[dt_naive_local] = r
-            except (ValueError, TypeError) as e:
-                print(f"Error parsing date for reservation {r.get('id')}: {e}")
-
-        for slot in slots_calculados:
-            try:
-                s_dt = datetime.fromisoformat(str(slot.get("inicio"))).replace(tzinfo=None)
-                f_dt = datetime.fromisoformat(str(slot.get("fin"))).replace(tzinfo=None)
-                k_tipo = slot.get("tipo", "no_habilitado")
-            except (ValueError, TypeError) as e:
-                print(f"WARN: Skipping slot due to invalid date: {slot} | Error: {e}")
-                continue
-
-            label = slot_label(s_dt, f_dt)
-            found_res_data = reservas_map.get(s_dt)
-
-            if found_res_data:
-                rid = found_res_data.get("id")
-                user_info = found_res_data.get("usuario", {})
-                nombre = user_info.get("nombre", "N/A")
-                current_user_id = user_data.get("id")
-                current_user_rol = user_data.get("rol")
-                is_owner = str(current_user_id) == str(user_info.get("id"))
-                is_admin = current_user_rol == "admin"
-                can_manage = is_owner or is_admin
-
-                # Versión móvil compacta
-                display_label = f"🟡 {label} - {nombre}" if is_mobile_view else f"Reservado por {nombre}"
-
-                if can_manage and state["confirm_for"] == rid:
-                    # Botones de confirmación adaptados a móvil
-                    if is_mobile_view:
-                        confirm_row = ft.Column([
-                            ft.Text("¿Cancelar reserva?", size=14, weight=ft.FontWeight.BOLD),
-                            ft.Row([
-                                Danger(
-                                    "Sí, cancelar",
-                                    on_click=lambda _, _rid=rid: do_cancel_reservation(_rid),
-                                    expand=True,
-                                    height=40,
-                                ),
-                                Ghost(
-                                    "No",
-                                    on_click=lambda e: (state.update({"confirm_for": None}), render()),
-                                    expand=True,
-                                    height=40,
-                                ),
-                            ])
-                        ], spacing=8)
-                        tiles.append(confirm_row)
-                    else:
-                        tiles.append(
-                            ft.Row([
-                                Danger("Confirmar", on_click=lambda _, _rid=rid: do_cancel_reservation(_rid)),
-                                Ghost("Volver", on_click=lambda e: (state.update({"confirm_for": None}), render())),
-                            ])
-                        )
-                else:
-                    btn = Tonal(
-                        display_label,
-                        tooltip="Toca para cancelar" if can_manage else "No puedes cancelar esta reserva",
-                        on_click=lambda _, _rid=rid, _lab=label: ask_inline_cancel(_rid, _lab) if can_manage and _rid else None,
-                        disabled=not can_manage,
-                        expand=is_mobile_view,
-                        height=44 if is_mobile_view else 50,
-                    )
-                    tiles.append(btn)
-
-            elif k_tipo in ["disponible", "libre"]:
-                is_allowed_to_create = user_data.get("rol") in ["admin", "docente"]
-                display_label = f"🟢 {label}" if is_mobile_view else label
-                
-                reserve_button = Primary(
-                    display_label,
-                    on_click=lambda _, ss=s_dt, ff=f_dt, _lid=lid: do_create_reservation(_lid, ss, ff) if is_allowed_to_create else None,
-                    disabled=not is_allowed_to_create,
-                    expand=is_mobile_view,
-                    height=44 if is_mobile_view else 50,
-                )
-                reserve_button.tooltip = "Solo admin/docente pueden reservar" if not is_allowed_to_create else None
-                tiles.append(reserve_button)
-
-            else:
-                display_label = f"🔴 {label}" if is_mobile_view else f"{k_tipo.capitalize()} {label}"
-                tiles.append(
-                    Tonal(
-                        display_label,
-                        disabled=True,
-                        expand=is_mobile_view,
-                        height=44 if is_mobile_view else 50,
-                    )
-                )
+        for slot in dia.slots:
+            reserva = dia.por_inicio.get(slot.inicio)
+            if reserva and reserva.id is not None:
+                reserva_dia[reserva.id] = d
+            control, firma = slot_tile(lid, slot, reserva)
+            holder = ft.Container(content=control, expand=is_mobile_view)
+            slot_controls[(lid, d, slot.inicio)] = {"control": holder, "firma": firma}
+            tiles.append(holder)
 
         # Contenedor de slots
         if is_mobile_view:
@@ -421,8 +444,118 @@ def ReservasView(page: ft.Page, api: ApiClient):
 
         return card_container
 
+    # VISTA GENERAL: TODOS LOS LABORATORIOS DEL PLANTEL
+    TODOS_LABS = "todos"
+    MATRIX_CELL = 34
+    MATRIX_LAB_COL = 150
+
+    def matrix_cell(lab: dict, slot: Slot | None, reserva: Reserva | None):
+        lab_id = int(lab["id"])
+        if slot is None:
+            return ft.Container(width=MATRIX_CELL, height=26)
+        label = f"{lab.get('nombre', '')} · {slot_label(slot.inicio, slot.fin)}"
+        if reserva:
+            return ft.Container(
+                width=MATRIX_CELL, height=26, border_radius=4, bgcolor=ft.Colors.AMBER_400,
+                tooltip=f"{label}\nReservado por {reserva.usuario_nombre}",
+            )
+        if slot.disponible:
+            can_create = user_data.get("rol") in ["admin", "docente"]
+            return ft.Container(
+                width=MATRIX_CELL, height=26, border_radius=4, bgcolor=ft.Colors.GREEN_400,
+                tooltip=f"{label}\n{'Toca para reservar' if can_create else 'Disponible'}",
+                on_click=(lambda _, _lid=lab_id, ss=slot.inicio, ff=slot.fin: do_create_reservation(_lid, ss, ff)) if can_create else None,
+            )
+        return ft.Container(
+            width=MATRIX_CELL, height=26, border_radius=4,
+            bgcolor=ft.Colors.with_opacity(0.25, ft.Colors.ON_SURFACE),
+            tooltip=f"{label}\n{slot.tipo.capitalize()}",
+        )
+
+    def matrix_section(d: date, labs: list[dict], agendas: dict):
+        """Tabla compacta laboratorio × slot para un día, con el conteo de slots libres."""
+        horas = sorted({slot.inicio.time() for lab in labs for slot in agendas[lab["id"]][d].slots})
+
+        header = ft.Row(
+            [ft.Container(width=MATRIX_LAB_COL)]
+            + [ft.Container(ft.Text(h.strftime("%H:%M"), size=9), width=MATRIX_CELL) for h in horas]
+            + [ft.Text("Libres", size=11, weight=ft.FontWeight.W_500)],
+            spacing=4,
+        )
+        rows = [header]
+        for lab in labs:
+            dia = agendas[lab["id"]][d]
+            by_time = {slot.inicio.time(): slot for slot in dia.slots}
+            libres = 0
+            cells = []
+            for h in horas:
+                slot = by_time.get(h)
+                reserva = dia.por_inicio.get(slot.inicio) if slot else None
+                if slot and slot.disponible and not reserva:
+                    libres += 1
+                cells.append(matrix_cell(lab, slot, reserva))
+            rows.append(ft.Row(
+                [ft.Container(ft.Text(lab.get("nombre", ""), size=12, no_wrap=True), width=MATRIX_LAB_COL)]
+                + cells
+                + [ft.Text(str(libres), size=12, weight=ft.FontWeight.BOLD,
+                           color=ft.Colors.GREEN_700 if libres else ft.Colors.ERROR)],
+                spacing=4,
+            ))
+
+        day_header = ft.Container(
+            content=ft.Row([
+                ft.Icon(ft.Icons.CALENDAR_TODAY, size=16),
+                ft.Text(f"{day_names_full[d.weekday()]} {d.strftime('%d/%m/%Y')}", size=16, weight=ft.FontWeight.W_600),
+            ]),
+            bgcolor=ft.Colors.PRIMARY_CONTAINER,
+            padding=12,
+            border_radius=ft.border_radius.only(top_left=12, top_right=12),
+        )
+        table = ft.Row(
+            [ft.Column(rows, spacing=4)],
+            scroll=ft.ScrollMode.AUTO,
+        )
+        return Card(ft.Column([day_header, ft.Container(table, padding=10)], spacing=0), padding=0)
+
+    def render_matrix():
+        pid = int(dd_plantel.value) if dd_plantel.value and dd_plantel.value.isdigit() else None
+        labs = [l for l in (catalogo.labs_de_plantel(pid) if pid is not None else []) if l.get("id")]
+        days_to_display = get_days_in_window(window["start"])
+
+        # Una agenda por laboratorio, en paralelo; las ya cacheadas no van al backend
+        resultados = api.gather(*[(api.get_agenda, int(l["id"]), days_to_display, user_data) for l in labs])
+        agendas, fallidos = {}, []
+        for lab, agenda in zip(labs, resultados):
+            if isinstance(agenda, dict) and "error" in agenda:
+                fallidos.append(lab.get("nombre", str(lab["id"])))
+            else:
+                agendas[lab["id"]] = agenda
+        labs_ok = [l for l in labs if l["id"] in agendas]
+
+        if fallidos:
+            info.value = f"No se pudo cargar la disponibilidad de: {', '.join(fallidos)}"
+            info.color = ft.Colors.ERROR
+            if info.page:
+                info.update()
+
+        for d in days_to_display:
+            grid.controls.append(matrix_section(d, labs_ok, agendas))
+
+        grid.disabled = False
+        if grid.page:
+            grid.update()
+
+        siguiente = five_weekdays_from(next_weekday(days_to_display[-1]))
+        for lab in labs_ok:
+            api.prefetch_agenda(int(lab["id"]), siguiente, user_data)
+
     def render_grid():
         grid.controls.clear()
+        slot_controls.clear()
+        reserva_dia.clear()
+        if dd_lab.value == TODOS_LABS:
+            render_matrix()
+            return
         if not dd_lab.value or not dd_lab.value.isdigit():
             info.value = "Selecciona un plantel y un laboratorio válido para ver la disponibilidad."
             info.color = ft.Colors.AMBER_700
@@ -432,55 +565,28 @@ def ReservasView(page: ft.Page, api: ApiClient):
 
         lid = int(dd_lab.value)
         days_to_display = get_days_in_window(window["start"])
-        end_dt_range_api = days_to_display[-1] + timedelta(days=1)
-
-        # Cargar horario y reservas
-        horario_result = api.get_horario_laboratorio(
-            lid, days_to_display[0], days_to_display[-1]
-        )
-        if not isinstance(horario_result, dict):
-            info.value = "Error al cargar horario: Respuesta inesperada"
-            info.color = ft.Colors.ERROR
-            if grid.page:
-                page.update(info, grid)
-            return
-        if "error" in horario_result:
-            info.value = f"Error al cargar horario: {horario_result.get('error')}"
-            info.color = ft.Colors.ERROR
-            if grid.page:
-                page.update(info, grid)
-            return
 
-        api_result = api.get_reservas(lid, days_to_display[0], end_dt_range_api)
-        all_reservas = []
-        if isinstance(api_result, list):
-            all_reservas = api_result
-        else:
-            info.value = f"Error al cargar reservas: {api_result.get('error', 'Error') if isinstance(api_result, dict) else 'Error'}"
+        # Horario y reservas por día: solo se descargan los días que no están en caché
+        agenda = api.get_agenda(lid, days_to_display, user_data)
+        if "error" in agenda:
+            origen = agenda.get("agenda", "horario")
+            info.value = f"Error al cargar {origen}: {agenda.get('error')}"
             info.color = ft.Colors.ERROR
             if grid.page:
                 page.update(info, grid)
             return
 
-        reservations_by_day = {d: [] for d in days_to_display}
-        for r in all_reservas:
-            try:
-                dt_aware_utc = datetime.fromisoformat(str(r.get("inicio")).replace("Z", "+00:00"))
-                dkey = dt_aware_utc.astimezone(None).date()
-                if dkey in reservations_by_day:
-                    reservations_by_day[dkey].append(r)
-            except (ValueError, TypeError) as e:
-                print(f"Error parsing date {r.get('inicio')} in render_grid: {e}")
-
         for d in days_to_display:
-            slots_for_day = horario_result.get(d.isoformat(), [])
-            reservations_for_day = reservations_by_day.get(d, [])
-            grid.controls.append(day_section(d, lid, slots_for_day, reservations_for_day))
+            grid.controls.append(day_section(d, lid, agenda[d]))
 
         grid.disabled = False
         if grid.page:
             grid.update()
 
+        # Precarga en segundo plano la semana anterior y la siguiente
+        api.prefetch_agenda(lid, five_weekdays_from(next_weekday(days_to_display[-1])), user_data)
+        api.prefetch_agenda(lid, five_weekdays_before(days_to_display[0]), user_data)
+
     def render():
         update_mobile_state()
 
@@ -491,7 +597,7 @@ def ReservasView(page: ft.Page, api: ApiClient):
                 info.update()
 
         days = get_days_in_window(window["start"])
-        lab_name = lab_map.get(dd_lab.value, "(Selecciona Lab)")
+        lab_name = "Todos los laboratorios" if dd_lab.value == TODOS_LABS else catalogo.lab_nombre(dd_lab.value, "(Selecciona Lab)")
         
         if state["is_mobile"]:
             current_date = state["selected_date"]
@@ -538,12 +644,14 @@ def ReservasView(page: ft.Page, api: ApiClient):
     def on_change_plantel(e: ft.ControlEvent):
         pid_str = e.control.value
         pid = int(pid_str) if pid_str and pid_str.isdigit() else None
-        filtered_labs = [l for l in labs_cache if l.get("plantel_id") == pid] if pid is not None else []
+        filtered_labs = catalogo.labs_de_plantel(pid) if pid is not None else []
         dd_lab.options = [
             ft.dropdown.Option(str(l["id"]), l["nombre"])
             for l in filtered_labs
             if l.get("id")
         ]
+        if len(dd_lab.options) > 1:
+            dd_lab.options.insert(0, ft.dropdown.Option(TODOS_LABS, "Todos los laboratorios"))
         dd_lab.value = str(filtered_labs[0]["id"]) if filtered_labs else None
 
         state["confirm_for"] = None
@@ -561,8 +669,8 @@ def ReservasView(page: ft.Page, api: ApiClient):
     dd_lab.on_change = on_change_lab
 
     # INICIALIZACIÓN
-    if planteles_cache:
-        first_plantel_id_str = str(planteles_cache[0].get("id", "")) if planteles_cache else ""
+    if catalogo.planteles:
+        first_plantel_id_str = str(catalogo.planteles[0].get("id", ""))
         if first_plantel_id_str:
             dd_plantel.value = first_plantel_id_str
             on_change_plantel(SimpleControlEvent(control=dd_plantel))
@@ -674,4 +782,4 @@ def ReservasView(page: ft.Page, api: ApiClient):
 
     page.add(ui)
     render()
-    return ui
\ No newline at end of file
+    return with_refresh(ui, render)
\ No newline at end of file
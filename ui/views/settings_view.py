@@ -1,13 +1,20 @@
 import flet as ft
 import re
-from api_client import ApiClient
+import threading
+from api_client import ApiClient, USERS_SERVER_PAGING
 from ui.components.cards import Card
+from ui.view_cache import with_refresh
 # --- Imports necesarios ---
 from ui.components.inputs import TextField # Asumiendo que usas tu TextField personalizado
 from ui.components.buttons import Primary, Ghost, Danger, Icon, Tonal # Para diálogos y botones
+from ui.components.paged_list import PagedList
 
 EMAIL_RX = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 
+SEARCH_DEBOUNCE_SECONDS = 0.3
+USERS_PAGE_SIZE = 30
+
+
 def SettingsView(page: ft.Page, api: ApiClient):
     """
     Vista para que el usuario actualice su perfil/contraseña
@@ -184,7 +191,7 @@ def SettingsView(page: ft.Page, api: ApiClient):
         label="Buscar por nombre, usuario o correo", 
         col={"xs": 12, "sm": 8, "md": 6}
     )
-    admin_search_tf.prefix_icon = ft.Icons.SEARCH
+    admin_search_tf.tf.prefix_icon = ft.Icons.SEARCH
     
     admin_role_dd = ft.Dropdown(
         label="Filtrar por Rol",
@@ -197,107 +204,60 @@ def SettingsView(page: ft.Page, api: ApiClient):
         col={"xs": 12, "sm": 4, "md": 3}
     )
     
-    admin_users_list = ft.ListView(spacing=10, expand=True)
-
-    def render_user_list():
-        admin_users_list.controls.clear()
-        query = admin_search_tf.value or ""
-        role = admin_role_dd.value or ""
-        users = api.get_users(q=query, rol=role) or []
-        if not users: 
-            admin_users_list.controls.append(
-                ft.Container(
-                    ft.Text("No se encontraron usuarios.", text_align=ft.TextAlign.CENTER),
-                    padding=20,
-                    alignment=ft.alignment.center
-                )
-            )
+    # Cada búsqueda lleva un número de generación: una respuesta que llega
+    # cuando ya se pidió otra más nueva se descarta.
+    search_state = {"gen": 0, "timer": None}
+    search_lock = threading.Lock()
+
+    def next_search_gen() -> int:
+        with search_lock:
+            if search_state["timer"] is not None:
+                search_state["timer"].cancel()
+                search_state["timer"] = None
+            search_state["gen"] += 1
+            return search_state["gen"]
+
+    def fetch_users_page(offset: int, limit: int):
+        return api.get_users(q=admin_search_tf.value or "", rol=admin_role_dd.value or "", offset=offset, limit=limit)
+
+    def build_user_tile(u: dict):
+        return user_tile(u) if u.get('id') != me.get('id') else None
+
+    admin_users_list = PagedList(
+        fetch_users_page,
+        build_user_tile,
+        page_size=USERS_PAGE_SIZE,
+        empty_text="No se encontraron usuarios.",
+        spacing=10,
+        expand=True,
+    )
+
+    def render_user_list(gen: int = None):
+        if gen is None:
+            gen = next_search_gen()
+        if USERS_SERVER_PAGING:
+            first_page = fetch_users_page(0, USERS_PAGE_SIZE)
+            if gen != search_state["gen"]:
+                return
+            admin_users_list.reset(first_page)
+            return
+        # Sin paginado en el backend: una sola descarga por búsqueda y las páginas
+        # salen de esa foto (si la caché expira a mitad del scroll no se repiten filas).
+        users = api.get_users(q=admin_search_tf.value or "", rol=admin_role_dd.value or "")
+        if gen != search_state["gen"]:
+            return
+        if isinstance(users, list):
+            admin_users_list.reset(items=users)
         else:
-            for user in users:
-                if user.get('id') != me.get('id'): 
-                    admin_users_list.controls.append(user_tile(user))
-        if admin_users_list.page: admin_users_list.update()
+            admin_users_list.reset(users)
 
     # --- MODIFICACIÓN: 'user_tile' adaptada para móvil ---
+    # Solo la fila de información se construye con la lista; los formularios
+    # de edición y borrado se crean la primera vez que se abren.
     def user_tile(u: dict):
         user_id = u.get('id')
+        forms = {"edit": None, "delete": None}
 
-        # --- Controles de edición (específicos para esta tarjeta) ---
-        tf_nombre_inline = TextField(label="Nombre", value=u.get('nombre'), col={"xs": 12})
-        tf_user_inline = TextField(label="Usuario", value=u.get('user'), col={"xs": 12})
-        tf_correo_inline = TextField(label="Correo", value=u.get('correo'), col={"xs": 12})
-        rol_inline_dd = ft.Dropdown(
-            label="Rol",
-            value=u.get('rol'),
-            options=[
-                ft.dropdown.Option("admin", "Admin"),
-                ft.dropdown.Option("docente", "Docente"),
-                ft.dropdown.Option("estudiante", "Estudiante"),
-            ],
-            col={"xs": 12}
-        )
-        pr_inline = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
-        save_btn_inline = Primary("Guardar", on_click=lambda e: save_inline_edit(e))
-        cancel_btn_inline = Tonal("Cancelar", on_click=lambda e: cancel_inline_edit(e))
-
-        # --- Controles de eliminación (específicos para esta tarjeta) ---
-        pr_delete_inline = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
-        confirm_btn_delete = Danger("Sí, Eliminar", on_click=lambda e: confirm_inline_delete(e))
-        cancel_btn_delete = Tonal("Cancelar", on_click=lambda e: cancel_inline_delete(e))
-
-        # --- Contenedor del formulario de edición (oculto) ---
-        edit_form_container = ft.ResponsiveRow(
-            controls=[
-                ft.Column([
-                    ft.Divider(height=10),
-                    tf_nombre_inline,
-                    tf_user_inline,
-                    tf_correo_inline,
-                    rol_inline_dd,
-                    ft.Container(
-                        ft.Row(
-                            [pr_inline, cancel_btn_inline, save_btn_inline], 
-                            alignment=ft.MainAxisAlignment.END,
-                            spacing=10,
-                            wrap=True
-                        ),
-                        padding=ft.padding.only(top=10)
-                    )
-                ], col={"xs": 12})
-            ],
-            visible=False,
-            opacity=0,
-            animate_opacity=200,
-            animate_size=200,
-            spacing=10,
-            run_spacing=10
-        )
-
-        # --- Contenedor de confirmación de borrado (oculto) ---
-        delete_confirm_container = ft.Container(
-            content=ft.Column(
-                [
-                    ft.Text("¿Seguro que quieres eliminar a este usuario? Esta acción no se puede deshacer.",
-                            style=ft.TextThemeStyle.BODY_MEDIUM, 
-                            color=ft.Colors.ERROR, 
-                            weight=ft.FontWeight.BOLD),
-                    ft.Row(
-                        [pr_delete_inline, cancel_btn_delete, confirm_btn_delete],
-                        alignment=ft.MainAxisAlignment.END,
-                        spacing=10,
-                        wrap=True
-                    )
-                ],
-                spacing=10
-            ),
-            padding=ft.padding.only(top=10),
-            visible=False,
-            opacity=0,
-            animate_opacity=200,
-            animate_size=200,
-            border=ft.border.only(top=ft.BorderSide(1, ft.Colors.OUTLINE_VARIANT))
-        )
-        
         # --- Fila de información (la que se ve siempre) - Adaptada para móvil ---
         info_column = ft.Column(
             [
@@ -342,128 +302,188 @@ def SettingsView(page: ft.Page, api: ApiClient):
         ], vertical_alignment=ft.CrossAxisAlignment.CENTER)
 
         # --- Contenedor principal de la tarjeta ---
-        card_content = ft.Column(
-            [
-                info_row, 
-                edit_form_container,
-                delete_confirm_container
-            ],
-            spacing=0
-        )
+        card_content = ft.Column([info_row], spacing=0)
+
+        def build_edit_form():
+            # --- Controles de edición (específicos para esta tarjeta) ---
+            tf_nombre_inline = TextField(label="Nombre", value=u.get('nombre'), col={"xs": 12})
+            tf_user_inline = TextField(label="Usuario", value=u.get('user'), col={"xs": 12})
+            tf_correo_inline = TextField(label="Correo", value=u.get('correo'), col={"xs": 12})
+            rol_inline_dd = ft.Dropdown(
+                label="Rol",
+                value=u.get('rol'),
+                options=[
+                    ft.dropdown.Option("admin", "Admin"),
+                    ft.dropdown.Option("docente", "Docente"),
+                    ft.dropdown.Option("estudiante", "Estudiante"),
+                ],
+                col={"xs": 12}
+            )
+            pr_inline = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
+            save_btn_inline = Primary("Guardar", on_click=lambda e: save_inline_edit(e))
+            cancel_btn_inline = Tonal("Cancelar", on_click=lambda e: toggle_edit(e))
 
-        # --- Funciones de Lógica Interna (Closures) ---
-        def toggle_edit(e):
-            """Muestra/oculta el formulario de edición. Oculta el de borrado."""
-            was_visible = edit_form_container.visible
-            # Oculta ambos
-            edit_form_container.visible = False
-            edit_form_container.opacity = 0
-            delete_confirm_container.visible = False
-            delete_confirm_container.opacity = 0
+            # --- Contenedor del formulario de edición (oculto) ---
+            edit_form_container = ft.ResponsiveRow(
+                controls=[
+                    ft.Column([
+                        ft.Divider(height=10),
+                        tf_nombre_inline,
+                        tf_user_inline,
+                        tf_correo_inline,
+                        rol_inline_dd,
+                        ft.Container(
+                            ft.Row(
+                                [pr_inline, cancel_btn_inline, save_btn_inline], 
+                                alignment=ft.MainAxisAlignment.END,
+                                spacing=10,
+                                wrap=True
+                            ),
+                            padding=ft.padding.only(top=10)
+                        )
+                    ], col={"xs": 12})
+                ],
+                visible=False,
+                opacity=0,
+                animate_opacity=200,
+                animate_size=200,
+                spacing=10,
+                run_spacing=10
+            )
 
-            if not was_visible:
-                # Muestra el de edición
-                edit_form_container.visible = True
-                edit_form_container.opacity = 1
-                # Resetea los campos a los valores originales
+            def reset_fields():
+                """Resetea los campos a los valores originales."""
                 tf_nombre_inline.value = u.get('nombre')
                 tf_user_inline.value = u.get('user')
                 tf_correo_inline.value = u.get('correo')
                 rol_inline_dd.value = u.get('rol')
-            card_content.update()
 
-        def cancel_inline_edit(e):
-            """Llama a toggle_edit para ocultar y resetear."""
-            toggle_edit(e)
+            def set_busy(busy: bool):
+                pr_inline.visible = busy
+                save_btn_inline.disabled = busy
+                cancel_btn_inline.disabled = busy
+                card_content.update()
 
-        def save_inline_edit(e):
-            """Lógica de guardado."""
-            pr_inline.visible = True
-            save_btn_inline.disabled = True
-            cancel_btn_inline.disabled = True
-            card_content.update()
+            def save_inline_edit(e):
+                """Lógica de guardado."""
+                set_busy(True)
 
-            nombre = tf_nombre_inline.value.strip()
-            user = tf_user_inline.value.strip()
-            correo = tf_correo_inline.value.strip().lower()
-            rol = rol_inline_dd.value
+                nombre = tf_nombre_inline.value.strip()
+                user = tf_user_inline.value.strip()
+                correo = tf_correo_inline.value.strip().lower()
+                rol = rol_inline_dd.value
 
-            error_msg = None
-            if not all([user_id, nombre, user, correo, rol]): error_msg = ("Campos Incompletos", "Todos los campos son obligatorios.")
-            elif not EMAIL_RX.match(correo): error_msg = ("Formato Inválido", "El formato del correo no es válido.")
+                error_msg = None
+                if not all([user_id, nombre, user, correo, rol]): error_msg = ("Campos Incompletos", "Todos los campos son obligatorios.")
+                elif not EMAIL_RX.match(correo): error_msg = ("Formato Inválido", "El formato del correo no es válido.")
 
-            if error_msg:
-                show_feedback(error_msg[0], error_msg[1], ft.Icons.WARNING, ft.Colors.AMBER)
-                pr_inline.visible = False
-                save_btn_inline.disabled = False
-                cancel_btn_inline.disabled = False
+                if error_msg:
+                    show_feedback(error_msg[0], error_msg[1], ft.Icons.WARNING, ft.Colors.AMBER)
+                    set_busy(False)
+                else:
+                    try:
+                        update_data = {"nombre": nombre, "user": user, "correo": correo, "rol": rol}
+                        updated_user = api.update_user_by_admin(user_id, update_data)
+                        
+                        if updated_user:
+                            edit_form_container.visible = False # Oculta el formulario
+                            show_feedback("Usuario Actualizado", f"Los datos de '{nombre}' se guardaron.", ft.Icons.CHECK_CIRCLE, ft.Colors.GREEN)
+                            render_user_list() # Recarga la lista de usuarios
+                        else:
+                            show_feedback("Error", "No se pudo actualizar. El usuario o correo puede ya existir.", ft.Icons.ERROR, ft.Colors.RED)
+                            set_busy(False)
+                    except Exception as ex:
+                        show_feedback("Error Inesperado", str(ex), ft.Icons.ERROR, ft.Colors.RED)
+                        set_busy(False)
+
+            edit_form_container.data = reset_fields
+            return edit_form_container
+
+        def build_delete_confirm():
+            # --- Controles de eliminación (específicos para esta tarjeta) ---
+            pr_delete_inline = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
+            confirm_btn_delete = Danger("Sí, Eliminar", on_click=lambda e: confirm_inline_delete(e))
+            cancel_btn_delete = Tonal("Cancelar", on_click=lambda e: toggle_delete(e))
+
+            # --- Contenedor de confirmación de borrado (oculto) ---
+            delete_confirm_container = ft.Container(
+                content=ft.Column(
+                    [
+                        ft.Text("¿Seguro que quieres eliminar a este usuario? Esta acción no se puede deshacer.",
+                                style=ft.TextThemeStyle.BODY_MEDIUM, 
+                                color=ft.Colors.ERROR, 
+                                weight=ft.FontWeight.BOLD),
+                        ft.Row(
+                            [pr_delete_inline, cancel_btn_delete, confirm_btn_delete],
+                            alignment=ft.MainAxisAlignment.END,
+                            spacing=10,
+                            wrap=True
+                        )
+                    ],
+                    spacing=10
+                ),
+                padding=ft.padding.only(top=10),
+                visible=False,
+                opacity=0,
+                animate_opacity=200,
+                animate_size=200,
+                border=ft.border.only(top=ft.BorderSide(1, ft.Colors.OUTLINE_VARIANT))
+            )
+
+            def set_busy(busy: bool):
+                pr_delete_inline.visible = busy
+                confirm_btn_delete.disabled = busy
+                cancel_btn_delete.disabled = busy
                 card_content.update()
-            else:
+
+            def confirm_inline_delete(e):
+                """Lógica de borrado."""
+                set_busy(True)
                 try:
-                    update_data = {"nombre": nombre, "user": user, "correo": correo, "rol": rol}
-                    updated_user = api.update_user_by_admin(user_id, update_data)
-                    
-                    if updated_user:
-                        edit_form_container.visible = False # Oculta el formulario
-                        show_feedback("Usuario Actualizado", f"Los datos de '{nombre}' se guardaron.", ft.Icons.CHECK_CIRCLE, ft.Colors.GREEN)
-                        render_user_list() # Recarga toda la lista de usuarios
+                    result = api.delete_user(user_id)
+                    if result:
+                        # No necesitamos ocultar el form, render_user_list() lo elimina
+                        show_feedback("Usuario Eliminado", f"El usuario '{u.get('nombre')}' ha sido eliminado.", ft.Icons.CHECK_CIRCLE, ft.Colors.GREEN)
+                        render_user_list() # Recarga la lista
                     else:
-                        show_feedback("Error", "No se pudo actualizar. El usuario o correo puede ya existir.", ft.Icons.ERROR, ft.Colors.RED)
-                        pr_inline.visible = False
-                        save_btn_inline.disabled = False
-                        cancel_btn_inline.disabled = False
-                        card_content.update()
+                        show_feedback("Error", "No se pudo eliminar el usuario. Puede tener préstamos/reservas activas.", ft.Icons.ERROR, ft.Colors.RED)
+                        set_busy(False)
                 except Exception as ex:
                     show_feedback("Error Inesperado", str(ex), ft.Icons.ERROR, ft.Colors.RED)
-                    pr_inline.visible = False
-                    save_btn_inline.disabled = False
-                    cancel_btn_inline.disabled = False
-                    card_content.update()
+                    set_busy(False)
 
-        def toggle_delete(e):
-            """Muestra/oculta la confirmación de borrado. Oculta la de edición."""
-            was_visible = delete_confirm_container.visible
-            # Oculta ambos
-            edit_form_container.visible = False
-            edit_form_container.opacity = 0
-            delete_confirm_container.visible = False
-            delete_confirm_container.opacity = 0
+            return delete_confirm_container
+
+        # --- Funciones de Lógica Interna (Closures) ---
+        def hide_forms():
+            for form in forms.values():
+                if form is not None:
+                    form.visible = False
+                    form.opacity = 0
+
+        def show_form(key: str, builder):
+            if forms[key] is None:
+                forms[key] = builder()
+                card_content.controls.append(forms[key])
+            forms[key].visible = True
+            forms[key].opacity = 1
+            return forms[key]
 
+        def toggle_edit(e):
+            """Muestra/oculta el formulario de edición. Oculta el de borrado."""
+            was_visible = forms["edit"] is not None and forms["edit"].visible
+            hide_forms()
             if not was_visible:
-                # Muestra el de borrado
-                delete_confirm_container.visible = True
-                delete_confirm_container.opacity = 1
+                show_form("edit", build_edit_form).data()
             card_content.update()
-        
-        def cancel_inline_delete(e):
-            """Llama a toggle_delete para ocultar."""
-            toggle_delete(e)
-
-        def confirm_inline_delete(e):
-            """Lógica de borrado."""
-            pr_delete_inline.visible = True
-            confirm_btn_delete.disabled = True
-            cancel_btn_delete.disabled = True
+
+        def toggle_delete(e):
+            """Muestra/oculta la confirmación de borrado. Oculta la de edición."""
+            was_visible = forms["delete"] is not None and forms["delete"].visible
+            hide_forms()
+            if not was_visible:
+                show_form("delete", build_delete_confirm)
             card_content.update()
-            
-            try:
-                result = api.delete_user(user_id)
-                if result:
-                    # No necesitamos ocultar el form, render_user_list() lo elimina
-                    show_feedback("Usuario Eliminado", f"El usuario '{u.get('nombre')}' ha sido eliminado.", ft.Icons.CHECK_CIRCLE, ft.Colors.GREEN)
-                    render_user_list() # Recarga toda la lista
-                else:
-                    show_feedback("Error", "No se pudo eliminar el usuario. Puede tener préstamos/reservas activas.", ft.Icons.ERROR, ft.Colors.RED)
-                    pr_delete_inline.visible = False
-                    confirm_btn_delete.disabled = False
-                    cancel_btn_delete.disabled = False
-                    card_content.update()
-            except Exception as ex:
-                show_feedback("Error Inesperado", str(ex), ft.Icons.ERROR, ft.Colors.RED)
-                pr_delete_inline.visible = False
-                confirm_btn_delete.disabled = False
-                cancel_btn_delete.disabled = False
-                card_content.update()
 
         return ft.Card(
             content=ft.Container(
@@ -474,8 +494,18 @@ def SettingsView(page: ft.Page, api: ApiClient):
             elevation=2.0
         )
 
-    def handle_search_change(e): render_user_list()
-    admin_search_tf.on_change = handle_search_change
+    def handle_search_change(e):
+        # Espera a que el admin deje de teclear; solo la última consulta llega al backend.
+        gen = next_search_gen()
+        timer = threading.Timer(SEARCH_DEBOUNCE_SECONDS, render_user_list, args=(gen,))
+        timer.daemon = True
+        with search_lock:
+            if gen != search_state["gen"]:
+                return
+            search_state["timer"] = timer
+        timer.start()
+
+    admin_search_tf.tf.on_change = handle_search_change
     admin_role_dd.on_change = lambda e: render_user_list()
 
     # --- Admin Tab Content - Versión Móvil ---
@@ -491,6 +521,72 @@ def SettingsView(page: ft.Page, api: ApiClient):
         expand=True
     )
 
+    # -------------------------------------
+    # --- Pestaña: Métricas de API (Admin Only) ---
+    # -------------------------------------
+    metrics_summary = ft.Text(size=13)
+    metrics_table = ft.DataTable(
+        columns=[
+            ft.DataColumn(ft.Text("Endpoint")),
+            ft.DataColumn(ft.Text("Peticiones"), numeric=True),
+            ft.DataColumn(ft.Text("Errores"), numeric=True),
+            ft.DataColumn(ft.Text("p50 ms"), numeric=True),
+            ft.DataColumn(ft.Text("p95 ms"), numeric=True),
+            ft.DataColumn(ft.Text("Máx ms"), numeric=True),
+            ft.DataColumn(ft.Text("KB"), numeric=True),
+        ],
+        rows=[],
+    )
+    metrics_dump = ft.Text(selectable=True, font_family="monospace", size=11, visible=False)
+
+    def render_metrics(e=None):
+        snapshot = api.metrics_snapshot()
+        cache = snapshot["catalog_cache"]
+        metrics_summary.value = (
+            f"Backend: {snapshot['breaker']}  ·  "
+            f"Caché de catálogos: {cache['hits']} aciertos / {cache['misses']} fallos "
+            f"({cache['hit_rate']:.0%})"
+        )
+        metrics_table.rows = [
+            ft.DataRow(cells=[
+                ft.DataCell(ft.Text(row["endpoint"], size=12)),
+                ft.DataCell(ft.Text(str(row["count"]))),
+                ft.DataCell(ft.Text(str(row["errors"]), color=ft.Colors.ERROR if row["errors"] else None)),
+                ft.DataCell(ft.Text(f"{row['p50_ms']:.0f}")),
+                ft.DataCell(ft.Text(f"{row['p95_ms']:.0f}")),
+                ft.DataCell(ft.Text(f"{row['max_ms']:.0f}")),
+                ft.DataCell(ft.Text(f"{row['bytes'] / 1024:.1f}")),
+            ])
+            for row in snapshot["endpoints"]
+        ]
+        if metrics_dump.visible:
+            metrics_dump.value = api.metrics_text() or "(sin peticiones registradas)"
+        if metrics_table.page:
+            page.update()
+
+    def toggle_metrics_dump(e):
+        metrics_dump.visible = not metrics_dump.visible
+        render_metrics()
+
+    metrics_content = ft.Column(
+        [
+            ft.Row(
+                [
+                    metrics_summary,
+                    ft.Row([
+                        Ghost("Volcado /metrics", on_click=toggle_metrics_dump),
+                        Tonal("Actualizar", icon=ft.Icons.REFRESH, on_click=render_metrics),
+                    ], spacing=8),
+                ],
+                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                wrap=True,
+            ),
+            ft.Row([metrics_table], scroll=ft.ScrollMode.AUTO),
+            metrics_dump,
+        ],
+        spacing=12,
+    )
+
     # -------------------------------------
     # --- Layout General con Tabs - Versión Móvil ---
     # -------------------------------------
@@ -512,15 +608,26 @@ def SettingsView(page: ft.Page, api: ApiClient):
             ft.Tab(
                 text="Administrar Usuarios",
                 icon=ft.Icons.PEOPLE_ALT_OUTLINED,
+                # Sin Column con scroll alrededor: el scroll es el de la lista
+                # paginada, que así puede pedir la siguiente página.
                 content=ft.Container(
-                    ft.Column([
-                        admin_settings_content
-                    ], scroll=ft.ScrollMode.ADAPTIVE),
+                    admin_settings_content,
                     padding=ft.padding.symmetric(vertical=10, horizontal=5)
                 )
             )
         )
         render_user_list()
+        tabs_list.append(
+            ft.Tab(
+                text="Métricas API",
+                icon=ft.Icons.INSIGHTS_OUTLINED,
+                content=ft.Container(
+                    ft.Column([metrics_content], scroll=ft.ScrollMode.ADAPTIVE),
+                    padding=ft.padding.symmetric(vertical=10, horizontal=5)
+                )
+            )
+        )
+        render_metrics()
 
     tabs = ft.Tabs(
         selected_index=0, 
@@ -529,7 +636,13 @@ def SettingsView(page: ft.Page, api: ApiClient):
         scrollable=True  # Tabs scrollables en móvil
     )
 
-    return ft.Container(
+    def refresh():
+        # Solo las pestañas de administración leen datos que cambian fuera de esta vista.
+        if is_admin:
+            render_user_list()
+            render_metrics()
+
+    return with_refresh(ft.Container(
         ft.Column(
             [
                 ft.Container(
@@ -543,4 +656,4 @@ def SettingsView(page: ft.Page, api: ApiClient):
             spacing=15,
         ),
         padding=ft.padding.symmetric(horizontal=5)
-    )
\ No newline at end of file
+    ), refresh)